@@ -8,14 +8,17 @@ Identifies edge cases that should cause form validation failures
 import pandas as pd
 import json
 
+from identity import IDENTITY_FIELDS, resolve_people
+from table_io import find_table, load_frame
+
 def analyze_validation_cases():
     print('🔍 ANALYZING DONATION DATA FOR VALIDATION EDGE CASES')
     print('=' * 60)
     
     # Load data
-    donors_df = pd.read_csv('../data/donors.csv')
-    kyc_df = pd.read_csv('../data/kyc.csv')
-    prospects_df = pd.read_csv('../data/prospects.csv')
+    donors_df = load_frame(find_table('../data', 'donors'))
+    kyc_df = load_frame(find_table('../data', 'kyc'))
+    prospects_df = load_frame(find_table('../data', 'prospects'))
     
     print(f'📊 Loaded {len(donors_df)} donations, {len(kyc_df)} KYC records, {len(prospects_df)} prospects')
     
@@ -46,28 +49,35 @@ def analyze_validation_cases():
     
     # CHECK 3: Cumulative contributions by person over limit
     print(f'\n📊 CHECK 3: CUMULATIVE CONTRIBUTION ANALYSIS')
-    cumulative = donors_df.groupby('unique_id').agg({
+    # The limit is per individual, so IDs that resolve to the same person are totalled together
+    people = resolve_people({field: donors_df[field].tolist() for field in IDENTITY_FIELDS if field in donors_df})
+    donors_df['person_id'] = donors_df['unique_id'].map(people)
+    cumulative = donors_df.groupby('person_id').agg({
         'first_name': 'first',
         'last_name': 'first',
+        'unique_id': lambda ids: ', '.join(ids.unique()),
         'contribution_amount': ['sum', 'count']
     }).round(2)
     
-    cumulative.columns = ['first_name', 'last_name', 'total_amount', 'num_contributions']
+    cumulative.columns = ['first_name', 'last_name', 'unique_ids', 'total_amount', 'num_contributions']
     cumulative = cumulative.reset_index()
+    merged = cumulative[cumulative['unique_ids'].str.contains(',')]
+    print(f'Found {len(merged)} people giving under more than one ID')
     
     # People already over cumulative limit
     over_cumulative = cumulative[cumulative['total_amount'] > 3300]
     print(f'Found {len(over_cumulative)} donors over cumulative $3300 limit')
     for _, row in over_cumulative.iterrows():
         failure_case = {
-            'unique_id': row['unique_id'],
+            'unique_id': row['person_id'],
+            'unique_ids': row['unique_ids'].split(', '),
             'name': f"{row['first_name']} {row['last_name']}",
             'failure_type': 'over_cumulative_limit',
             'amount': row['total_amount'],
             'reason': f'Cumulative contributions ${row["total_amount"]} exceed $3300 limit ({row["num_contributions"]} donations)'
         }
         validation_failures.append(failure_case)
-        print(f'  ❌ {row["first_name"]} {row["last_name"]} (ID: {row["unique_id"]}): ${row["total_amount"]} across {row["num_contributions"]} contributions')
+        print(f'  ❌ {row["first_name"]} {row["last_name"]} (ID: {row["unique_ids"]}): ${row["total_amount"]} across {row["num_contributions"]} contributions')
     
     # People who would go over limit with new $100 donation
     near_limit = cumulative[(cumulative['total_amount'] > 3200) & (cumulative['total_amount'] <= 3300)]
@@ -76,7 +86,8 @@ def analyze_validation_cases():
     for _, row in near_limit.iterrows():
         remaining = 3300 - row['total_amount']
         failure_case = {
-            'unique_id': row['unique_id'],
+            'unique_id': row['person_id'],
+            'unique_ids': row['unique_ids'].split(', '),
             'name': f"{row['first_name']} {row['last_name']}",
             'failure_type': 'would_exceed_with_new_donation',
             'current_amount': row['total_amount'],
@@ -1,36 +1,33 @@
 #!/usr/bin/env python3
 """Quick contribution analysis script"""
 
-import csv
+from campaign_table import CompactTable
+from table_io import find_table
+from wallets import BAD_CHECKSUM, BAD_FORMAT, validate_wallets
 
-with open('data/donors.csv', 'r') as f:
-    donors = list(csv.DictReader(f))
+donors = CompactTable.load(find_table('data', 'donors'), ['unique_id', 'contribution_amount', 'wallet_address'])
 
-# Check contribution amounts
-amounts = [float(d['contribution_amount']) for d in donors]
-print(f'Total contributions: ${sum(amounts):,.2f}')
-print(f'Average contribution: ${sum(amounts)/len(amounts):,.2f}')
-print(f'Max contribution: ${max(amounts):,.2f}')
-print(f'Min contribution: ${min(amounts):,.2f}')
+# Check contribution amounts (integer cents)
+amounts = donors.typed('contribution_amount')
+total = sum(amounts)
+print(f'Total contributions: ${total / 100:,.2f}')
+print(f'Average contribution: ${total / len(amounts) / 100:,.2f}')
+print(f'Max contribution: ${max(amounts) / 100:,.2f}')
+print(f'Min contribution: ${min(amounts) / 100:,.2f}')
 
 # Check for $3,300 contributions
-exactly_3300 = [d for d in donors if float(d['contribution_amount']) == 3300.00]
-print(f'Exactly $3,300 contributions: {len(exactly_3300)}')
+exactly_3300 = amounts.count(330000)
+print(f'Exactly $3,300 contributions: {exactly_3300}')
 
 # Check unique donors
-unique_donors = set(d['unique_id'] for d in donors)
+unique_donors = donors.distinct('unique_id')
 print(f'Unique donors: {len(unique_donors)}')
 
-# Check wallet address format
-invalid_wallets = []
-for d in donors:
-    wallet = d['wallet_address']
-    if not wallet.startswith('0x') or len(wallet) != 42:
-        invalid_wallets.append(wallet)
-    # Check hex characters
-    try:
-        int(wallet[2:], 16)
-    except ValueError:
-        invalid_wallets.append(wallet)
+# Check wallet address format and EIP-55 checksums, once per distinct wallet
+wallet_counts = donors.value_counts('wallet_address')
+statuses = validate_wallets(list(wallet_counts))
+invalid_wallets = sum(count for count, status in zip(wallet_counts.values(), statuses) if status == BAD_FORMAT)
+bad_checksums = sum(count for count, status in zip(wallet_counts.values(), statuses) if status == BAD_CHECKSUM)
 
-print(f'Invalid wallet addresses: {len(invalid_wallets)}')
\ No newline at end of file
+print(f'Invalid wallet addresses: {invalid_wallets}')
+print(f'Bad EIP-55 checksums: {bad_checksums}')
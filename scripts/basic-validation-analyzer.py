@@ -5,37 +5,31 @@ Basic Validation Data Analyzer
 Uses only standard library to analyze donation validation cases
 """
 
-import csv
 import json
 from collections import defaultdict
 
+from identity import IDENTITY_FIELDS, resolve_people
+from table_io import find_table, iter_rows
+from table_join import join_rows
+
 def analyze_validation_cases():
     print('🔍 ANALYZING DONATION DATA FOR VALIDATION EDGE CASES')
     print('=' * 60)
     
     # Load donors data
     donors = []
-    with open('../data/donors.csv', 'r') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            row['contribution_amount'] = float(row['contribution_amount'])
-            donors.append(row)
-    
-    # Load KYC data
-    kyc = []
-    with open('../data/kyc.csv', 'r') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            kyc.append(row)
-    
-    # Load prospects data
-    prospects = []
-    with open('../data/prospects.csv', 'r') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            prospects.append(row)
-    
-    print(f'📊 Loaded {len(donors)} donations, {len(kyc)} KYC records, {len(prospects)} prospects')
+    donor_fields = IDENTITY_FIELDS + ['contribution_amount']
+    for row in iter_rows(find_table('../data', 'donors'), donor_fields):
+        row['contribution_amount'] = float(row['contribution_amount'])
+        donors.append(row)
+    
+    # KYC and prospects are streamed and joined below rather than loaded
+    kyc_path = find_table('../data', 'kyc')
+    prospects_path = find_table('../data', 'prospects')
+    kyc_count = sum(1 for _ in iter_rows(kyc_path, ['unique_id']))
+    prospect_count = sum(1 for _ in iter_rows(prospects_path, ['unique_id']))
+    
+    print(f'📊 Loaded {len(donors)} donations, {kyc_count} KYC records, {prospect_count} prospects')
     
     validation_failures = []
     
@@ -65,16 +59,22 @@ def analyze_validation_cases():
     # CHECK 3: Cumulative contributions by person
     print(f'\n📊 CHECK 3: CUMULATIVE CONTRIBUTION ANALYSIS')
     
-    # Calculate cumulative amounts per person
-    cumulative = defaultdict(lambda: {'total': 0, 'count': 0, 'first_name': '', 'last_name': ''})
+    # Calculate cumulative amounts per person; IDs that resolve to the same person are totalled together
+    people = resolve_people({field: [donor[field] for donor in donors] for field in IDENTITY_FIELDS})
+    cumulative = defaultdict(lambda: {'total': 0, 'count': 0, 'first_name': '', 'last_name': '', 'ids': []})
     
     for donor in donors:
-        uid = donor['unique_id']
+        uid = people[donor['unique_id']]
+        if donor['unique_id'] not in cumulative[uid]['ids']:
+            cumulative[uid]['ids'].append(donor['unique_id'])
         cumulative[uid]['total'] += donor['contribution_amount']
         cumulative[uid]['count'] += 1
         cumulative[uid]['first_name'] = donor['first_name']
         cumulative[uid]['last_name'] = donor['last_name']
     
+    merged = [uid for uid, data in cumulative.items() if len(data['ids']) > 1]
+    print(f'Found {len(merged)} people giving under more than one ID')
+    
     # Find people over cumulative limit
     over_cumulative = [(uid, data) for uid, data in cumulative.items() if data['total'] > 3300]
     print(f'Found {len(over_cumulative)} donors over cumulative $3300 limit')
@@ -82,13 +82,14 @@ def analyze_validation_cases():
     for uid, data in over_cumulative:
         failure_case = {
             'unique_id': uid,
+            'unique_ids': data['ids'],
             'name': f"{data['first_name']} {data['last_name']}",
             'failure_type': 'over_cumulative_limit',
             'amount': data['total'],
             'reason': f'Cumulative contributions ${data["total"]:.2f} exceed $3300 limit ({data["count"]} donations)'
         }
         validation_failures.append(failure_case)
-        print(f'  ❌ {data["first_name"]} {data["last_name"]} (ID: {uid}): ${data["total"]:.2f} across {data["count"]} contributions')
+        print(f'  ❌ {data["first_name"]} {data["last_name"]} (ID: {", ".join(data["ids"])}): ${data["total"]:.2f} across {data["count"]} contributions')
     
     # Find people near limit who would go over with new $100 donation
     near_limit = [(uid, data) for uid, data in cumulative.items() 
@@ -101,6 +102,7 @@ def analyze_validation_cases():
         remaining = 3300 - data['total']
         failure_case = {
             'unique_id': uid,
+            'unique_ids': data['ids'],
             'name': f"{data['first_name']} {data['last_name']}",
             'failure_type': 'would_exceed_with_new_donation',
             'current_amount': data['total'],
@@ -113,26 +115,24 @@ def analyze_validation_cases():
     # CHECK 5: KYC rejection cases  
     print(f'\n🚫 CHECK 5: KYC REJECTION CASES')
     
-    # Create prospect lookup
-    prospect_lookup = {p['unique_id']: p for p in prospects}
-    
-    kyc_failed = [k for k in kyc if k['kyc_status'].lower() in ['failed', 'pending', 'no', 'rejected', 'denied']]
+    kyc_failed = [k for k in iter_rows(kyc_path, ['unique_id', 'kyc_status'])
+                  if k['kyc_status'].lower() in ['failed', 'pending', 'no', 'rejected', 'denied']]
     
     print(f'Found {len(kyc_failed)} KYC rejection cases')
     
-    for kyc_record in kyc_failed:
+    # Join the rejections to prospects, in memory or out of core depending on the prospects' size
+    prospects = iter_rows(prospects_path, ['unique_id', 'first_name', 'last_name'])
+    for kyc_record, prospect in join_rows(kyc_failed, prospects):
         uid = kyc_record['unique_id']
-        if uid in prospect_lookup:
-            prospect = prospect_lookup[uid]
-            failure_case = {
-                'unique_id': uid,
-                'name': f"{prospect['first_name']} {prospect['last_name']}",
-                'failure_type': 'kyc_rejection',
-                'kyc_status': kyc_record['kyc_status'],
-                'reason': f'KYC status: {kyc_record["kyc_status"]} - donation should be blocked'
-            }
-            validation_failures.append(failure_case)
-            print(f'  ❌ {prospect["first_name"]} {prospect["last_name"]} (ID: {uid}): KYC {kyc_record["kyc_status"]}')
+        failure_case = {
+            'unique_id': uid,
+            'name': f"{prospect['first_name']} {prospect['last_name']}",
+            'failure_type': 'kyc_rejection',
+            'kyc_status': kyc_record['kyc_status'],
+            'reason': f'KYC status: {kyc_record["kyc_status"]} - donation should be blocked'
+        }
+        validation_failures.append(failure_case)
+        print(f'  ❌ {prospect["first_name"]} {prospect["last_name"]} (ID: {uid}): KYC {kyc_record["kyc_status"]}')
     
     # SUMMARY
     print(f'\n📋 VALIDATION FAILURE SUMMARY')
@@ -148,7 +148,7 @@ def analyze_validation_cases():
         print(f'{ftype.replace("_", " ").title()}: {count}')
     
     # Calculate expected success rate
-    total_prospects = len(prospects)
+    total_prospects = prospect_count
     expected_failures = len(validation_failures)
     expected_successes = total_prospects - expected_failures
     expected_success_rate = (expected_successes / total_prospects) * 100
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Benchmark campaign data generation across a ladder of sizes
+
+Each size is a campaign with that many contribution rows, shaped like the
+150/215 baseline (same donor, overlap and KYC-failure ratios). Every
+(size, stage) runs in a fresh subprocess so peak RSS is measured per run:
+
+- generate: the scale-mode generator is consumed without writing, and the
+  time between rows is attributed to the prospects, kyc or donors stage
+- save_csv: the same campaign is written to CSV files in a temp directory
+
+Results are saved as a JSON baseline; --compare flags regressions in
+rows/sec, peak RSS or output bytes beyond --threshold against a baseline.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # not available on Windows; peak RSS is then reported as 0
+    resource = None
+
+DEFAULT_SIZES = '1k,100k,1M,10M'
+GENERATE_STAGES = ['prospects', 'kyc', 'donors']
+# Ledger rows are bookkeeping for the donors just generated
+STAGE_OF_TABLE = {'prospects': 'prospects', 'kyc': 'kyc', 'donors': 'donors', 'ledger': 'donors'}
+SUFFIXES = {'k': 1000, 'm': 1000000}
+# Timings shorter than this are too noisy to flag
+MIN_TIMED_SECONDS = 0.2
+
+def parse_size(text):
+    """Parse a size like 1000, 100k or 1M"""
+    text = text.strip().lower()
+    if text[-1:] in SUFFIXES:
+        return int(float(text[:-1]) * SUFFIXES[text[-1]])
+    return int(text)
+
+def campaign_shape(size):
+    """Prospects, donors, contributions, overlap and KYC failures for a campaign of `size` contributions"""
+    donors = max(1, size * 150 // 215)
+    overlap = donors * 38 // 150
+    kyc_fail = donors * 11 // 150
+    return donors, donors, size, overlap, kyc_fail
+
+def peak_rss_mb():
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes elsewhere
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024
+
+def with_rate(stage):
+    stage['rows_per_sec'] = stage['rows'] / stage['wall_s'] if stage['wall_s'] else 0.0
+    return stage
+
+def run_generate(plan, backend, chunk_size, seed):
+    """Consume the generator without writing, attributing time to the table each row belongs to"""
+    from generate_clean_data import generate_campaign_columns, generate_campaign_stream
+
+    stages = {name: {'wall_s': 0.0, 'rows': 0, 'bytes': 0} for name in GENERATE_STAGES}
+    if backend == 'numpy':
+        chunks = generate_campaign_columns(plan, chunk_size, seed)
+    else:
+        chunks = generate_campaign_stream(plan)
+
+    last = time.perf_counter()
+    for table, data in chunks:
+        now = time.perf_counter()
+        stage = stages[STAGE_OF_TABLE[table]]
+        stage['wall_s'] += now - last
+        if table != 'ledger':
+            stage['rows'] += len(data['unique_id']) if backend == 'numpy' else 1
+        last = now
+    return stages
+
+def run_save_csv(plan, backend, chunk_size, seed, fmt):
+    """Write the campaign in the given table format and measure rows and bytes written"""
+    from generate_clean_data import TABLE_FIELDS, write_campaign
+    from table_io import table_path
+
+    out_dir = tempfile.mkdtemp(prefix='generator-benchmark-')
+    try:
+        paths = {table: table_path(out_dir, table, fmt) for table in TABLE_FIELDS}
+        start = time.perf_counter()
+        rows = write_campaign(plan, paths, backend, chunk_size, seed)
+        wall = time.perf_counter() - start
+        size = sum(os.path.getsize(path) for path in paths.values())
+    finally:
+        shutil.rmtree(out_dir)
+    return {'save_csv': {'wall_s': wall, 'rows': sum(rows.values()), 'bytes': size}}
+
+def run_worker(stage, size, backend, chunk_size, seed, fmt):
+    """Run one benchmark stage in this process and print its measurements as JSON"""
+    import random
+    from generate_clean_data import plan_campaign
+
+    random.seed(seed)
+    plan = plan_campaign(*campaign_shape(size))
+    random.seed(seed)
+    if stage == 'generate':
+        stages = run_generate(plan, backend, chunk_size, seed)
+    else:
+        stages = run_save_csv(plan, backend, chunk_size, seed, fmt)
+
+    rss = peak_rss_mb()
+    for measurement in stages.values():
+        measurement['peak_rss_mb'] = rss
+        with_rate(measurement)
+    print(json.dumps(stages))
+
+def run_benchmark(sizes, backend, chunk_size, seed, fmt):
+    """Run every stage at every size in fresh subprocesses and collect the results"""
+    results = {}
+    print(f"Benchmarking generator ({backend} backend, {fmt} output, seed {seed})")
+    print(f"  {'size':>6}  {'stage':<10} {'wall s':>9} {'rows/sec':>12} {'peak RSS MB':>12} {'bytes':>14}")
+    for label in sizes:
+        size = parse_size(label)
+        stages = {}
+        for stage in ('generate', 'save_csv'):
+            command = [sys.executable, os.path.abspath(__file__), '--worker', stage, str(size),
+                       '--backend', backend, '--chunk-size', str(chunk_size), '--seed', str(seed),
+                       '--format', fmt]
+            output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+            stages.update(json.loads(output.splitlines()[-1]))
+
+        for name, m in stages.items():
+            print(f"  {label:>6}  {name:<10} {m['wall_s']:>9.3f} {m['rows_per_sec']:>12,.0f} "
+                  f"{m['peak_rss_mb']:>12.1f} {m['bytes']:>14,}")
+        prospects, donors, contributions, overlap, kyc_fail = campaign_shape(size)
+        results[label] = {
+            'shape': {'prospects': prospects, 'donors': donors, 'contributions': contributions,
+                      'overlap': overlap, 'kyc_fail': kyc_fail},
+            'stages': stages
+        }
+
+    return {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'backend': backend,
+        'format': fmt,
+        'chunk_size': chunk_size,
+        'seed': seed,
+        'results': results
+    }
+
+def compare_results(baseline, current, threshold):
+    """Print per-stage changes against a baseline and return the list of regressions"""
+    regressions = []
+    print(f"\nComparing against baseline from {baseline.get('generated_at', 'unknown')} "
+          f"(threshold {threshold:.0%}, positive changes are worse)")
+    for label, result in current['results'].items():
+        if label not in baseline['results']:
+            print(f"  • {label}: not in baseline, skipped")
+            continue
+        for name, m in result['stages'].items():
+            old = baseline['results'][label]['stages'].get(name)
+            if old is None:
+                continue
+
+            changes = []
+            if old['wall_s'] >= MIN_TIMED_SECONDS and old['rows_per_sec']:
+                slowdown = old['rows_per_sec'] / m['rows_per_sec'] - 1 if m['rows_per_sec'] else 1.0
+                changes.append(('time/row', slowdown))
+            if old['peak_rss_mb']:
+                changes.append(('peak RSS', m['peak_rss_mb'] / old['peak_rss_mb'] - 1))
+            if old['bytes']:
+                changes.append(('bytes', m['bytes'] / old['bytes'] - 1))
+
+            # Positive change means worse: slower, more memory or bigger output
+            worse = [(metric, change) for metric, change in changes if change > threshold]
+            summary = ', '.join(f"{metric} {change:+.1%}" for metric, change in changes)
+            mark = '✗' if worse else '✓'
+            print(f"  {mark} {label} {name}: {summary or 'too fast to compare'}")
+            regressions.extend(f"{label} {name}: {metric} {change:.1%} worse" for metric, change in worse)
+    return regressions
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark campaign data generation throughput and memory')
+    parser.add_argument('--sizes', default=DEFAULT_SIZES,
+                        help=f'Comma-separated contribution counts (default: {DEFAULT_SIZES})')
+    parser.add_argument('--backend', choices=['python', 'numpy'], default='python', help='Generator backend')
+    parser.add_argument('--chunk-size', type=int, default=10000, help='Rows buffered per write')
+    parser.add_argument('--format', choices=['csv', 'csv.gz', 'csv.zst', 'columnar'], default='csv',
+                        help='Table format written by the save_csv stage')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed for the benchmarked campaigns')
+    parser.add_argument('--output', default='generator-benchmark.json', help='Where to save the results JSON')
+    parser.add_argument('--compare', help='Baseline JSON to compare the new results against')
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help='Relative change that counts as a regression (default: 0.15)')
+    parser.add_argument('--worker', nargs=2, metavar=('STAGE', 'SIZE'), help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    if args.worker:
+        stage, size = args.worker
+        run_worker(stage, int(size), args.backend, args.chunk_size, args.seed, args.format)
+        return
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    results = run_benchmark(args.sizes.split(','), args.backend, args.chunk_size, args.seed, args.format)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\n✓ Results saved to {args.output}")
+
+    if baseline is not None:
+        if baseline.get('backend') != args.backend:
+            print(f"  Note: baseline used the {baseline.get('backend')} backend")
+        if baseline.get('format', 'csv') != args.format:
+            print(f"  Note: baseline wrote {baseline.get('format', 'csv')} output")
+        regressions = compare_results(baseline, results, args.threshold)
+        if regressions:
+            print(f"\n✗ {len(regressions)} REGRESSIONS FOUND:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            sys.exit(1)
+        print("\n✓ NO REGRESSIONS")
+
+if __name__ == "__main__":
+    main()
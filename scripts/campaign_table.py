@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Compact in-memory campaign tables
+
+CompactTable holds a table as typed column buffers instead of one dict of
+strings per row:
+
+- unique_id and other repetitive string columns (names, and categoricals
+  such as state or kyc_status) are dictionary-encoded: an int32 code per
+  row into the list of distinct values, so a repeated ID or category is
+  stored once. Tables loaded with a shared Interner give the same ID the
+  same code.
+- mostly-distinct string columns (wallets, phone numbers) are packed into
+  one bytearray with an offset per row instead of a string object per value
+- amounts are int64 cents, dates int32 day ordinals and counts int64, kept
+  in array buffers that numpy() exposes without copying
+- rows and row(i) are __slots__ Row views that read like the
+  csv.DictReader dicts they replace
+
+A typed column whose CSV text does not survive the round trip (an amount
+written as "3300" rather than "3300.00", or a blank) is kept as encoded
+strings instead, so rows always read back exactly as loaded.
+"""
+
+from array import array
+from collections import Counter
+from collections.abc import Mapping
+from itertools import accumulate, chain
+
+from table_io import (ARRAY_CODES, canonical_cents, column_text, column_type, format_cents, is_columnar,
+                      iter_batches, iter_column_chunks, ordinal_date, table_header, typed_column)
+
+try:
+    import numpy as np
+except ImportError:  # only needed by numpy() and for faster group aggregations
+    np = None
+
+NUMPY_DTYPES = {'q': 'int64', 'i': 'int32'}
+TEXT_FORMATS = {'cents': format_cents, 'date': ordinal_date, 'int': str}
+# Always interned, since other tables join on it
+INTERNED_FIELDS = {'unique_id'}
+
+class Interner:
+    """Dense int codes for distinct strings, in first-seen order"""
+
+    __slots__ = ('index', 'cached_values')
+
+    def __init__(self):
+        self.index = {}
+        self.cached_values = []
+
+    def encode(self, values):
+        """Codes for a sequence of strings, giving unseen strings the next free codes"""
+        index = self.index
+        return [index.setdefault(value, len(index)) for value in values]
+
+    def code(self, value):
+        """Code of a string, or -1 if it has never been seen"""
+        return self.index.get(value, -1)
+
+    @property
+    def values(self):
+        """Distinct strings, indexed by code"""
+        if len(self.cached_values) != len(self.index):
+            self.cached_values = list(self.index)
+        return self.cached_values
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getstate__(self):
+        return self.index
+
+    def __setstate__(self, index):
+        self.index = index
+        self.cached_values = []
+
+class EncodedColumn:
+    """A dictionary-encoded string column: int32 codes per row into an Interner's values"""
+
+    __slots__ = ('interner', 'codes')
+
+    def __init__(self, interner=None):
+        self.interner = interner if interner is not None else Interner()
+        self.codes = array('i')
+
+    def extend(self, values):
+        self.codes.extend(self.interner.encode(values))
+
+    def counts(self):
+        """Rows per code, as a NumPy array when available and a list otherwise"""
+        if np is not None:
+            return np.bincount(np.frombuffer(self.codes, dtype='int32'), minlength=len(self.interner))
+        counts = [0] * len(self.interner)
+        for code, count in Counter(self.codes).items():
+            counts[code] = count
+        return counts
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, i):
+        return self.interner.values[self.codes[i]]
+
+class PackedColumn:
+    """Strings packed back to back as UTF-8 in one bytearray, with an int64 end offset per value"""
+
+    __slots__ = ('data', 'ends')
+
+    def __init__(self):
+        self.data = bytearray()
+        self.ends = array('q')
+
+    @staticmethod
+    def suits(values):
+        """Whether a first batch is mostly distinct, so interning would not save anything"""
+        return len(set(values)) > len(values) // 2
+
+    def extend(self, values):
+        encoded = [value.encode() for value in values]
+        ends = accumulate(map(len, encoded), initial=len(self.data))
+        next(ends)
+        self.ends.extend(ends)
+        self.data += b''.join(encoded)
+
+    def __len__(self):
+        return len(self.ends)
+
+    def __getitem__(self, i):
+        start = self.ends[i - 1] if i else 0
+        return self.data[start:self.ends[i]].decode()
+
+    def __iter__(self):
+        text = self.data.decode()
+        if len(text) != len(self.data):  # non-ASCII: byte offsets are not character offsets
+            return (self[i] for i in range(len(self)))
+        return (text[start:end] for start, end in zip(chain((0,), self.ends), self.ends))
+
+class Row(Mapping):
+    """Read-only view of one table row, mapping field names to their CSV text"""
+
+    __slots__ = ('table', 'index')
+
+    def __init__(self, table, index):
+        self.table = table
+        self.index = index
+
+    def __getitem__(self, field):
+        if field not in self.table.columns:
+            raise KeyError(field)
+        return self.table.value(field, self.index)
+
+    def __iter__(self):
+        return iter(self.table.fields)
+
+    def __len__(self):
+        return len(self.table.fields)
+
+    def copy(self):
+        """The row as a plain dict, like the csv.DictReader row it stands in for"""
+        return dict(self.items())
+
+    def __repr__(self):
+        return f"Row({self.copy()!r})"
+
+class CompactTable:
+    """A campaign table held as typed column buffers; see the module docstring"""
+
+    def __init__(self, fields, interners=None):
+        interners = interners or {}
+        # Columns that may switch to packed storage on their first batch
+        self.packable = {field for field in fields if field not in interners and field not in INTERNED_FIELDS}
+        self.fields = list(fields)
+        self.columns = {}
+        for field in self.fields:
+            kind = column_type(field)
+            if kind in ARRAY_CODES:
+                self.columns[field] = array(ARRAY_CODES[kind])
+            else:
+                self.columns[field] = EncodedColumn(interners.get(field))
+        self.length = 0
+
+    @classmethod
+    def load(cls, path, fields=None, interners=None):
+        """Load a table of any supported format, optionally only some of its fields.
+
+        `interners` maps field names to Interner objects to share with other
+        tables, e.g. {'unique_id': ids} to give IDs the same code everywhere.
+        """
+        path = str(path)
+        table = cls(table_header(path) if fields is None else fields, interners)
+        if not table.fields:
+            return table
+        batches = iter_column_chunks(path, table.fields) if is_columnar(path) else iter_batches(path, table.fields)
+        for batch in batches:
+            table.extend(batch)
+        return table
+
+    def extend(self, batch):
+        """Append rows given as {field: values}, either CSV text or typed columnar values"""
+        for field in self.fields:
+            column = self.columns[field]
+            values = batch[field]
+            kind = column_type(field)
+            if kind not in ARRAY_CODES:
+                values = column_text(kind, values) if isinstance(values, array) else values
+                if not self.length and field in self.packable and PackedColumn.suits(values):
+                    column = self.columns[field] = PackedColumn()
+                column.extend(values)
+                continue
+            if isinstance(column, EncodedColumn):
+                # Once a typed column has fallen back to text, later batches must be stored as text too
+                column.extend(column_text(kind, values))
+                continue
+            if isinstance(values, array):
+                column.extend(values)
+                continue
+            if kind == 'cents':
+                typed = canonical_cents(values)
+                if typed is not None:
+                    column.extend(typed)
+                    continue
+            try:
+                typed = typed_column(kind, values)
+            except (ValueError, OverflowError):
+                typed = None
+            if typed is not None and column_text(kind, typed) == list(values):
+                column.extend(typed)
+            else:
+                encoded = EncodedColumn()
+                encoded.extend(column_text(kind, column))
+                encoded.extend(values)
+                self.columns[field] = encoded
+        if self.fields:
+            self.length += len(batch[self.fields[0]])
+
+    def __len__(self):
+        return self.length
+
+    def value(self, field, i):
+        """CSV text of one cell"""
+        column = self.columns[field]
+        if isinstance(column, array):
+            return TEXT_FORMATS[column_type(field)](column[i])
+        return column[i]
+
+    def column(self, field):
+        """CSV text of a whole column, as a list"""
+        column = self.columns[field]
+        if isinstance(column, array):
+            return column_text(column_type(field), column)
+        if isinstance(column, EncodedColumn):
+            values = column.interner.values
+            return [values[code] for code in column.codes]
+        return list(column)
+
+    def row(self, i):
+        return Row(self, i)
+
+    def __iter__(self):
+        return (Row(self, i) for i in range(self.length))
+
+    def typed(self, field, default=None):
+        """A numeric column as its int buffer (cents, day ordinals or ints).
+
+        Columns kept as text are parsed once per distinct value. Values that
+        do not parse - and every row when the field is missing - raise
+        ValueError, or become `default` when one is given.
+        """
+        kind = column_type(field)
+        if kind not in ARRAY_CODES:
+            kind = 'int'
+        column = self.columns.get(field)
+        if isinstance(column, array):
+            return column
+        if column is None:
+            if default is None:
+                raise ValueError(f"Table has no {field} column")
+            return array(ARRAY_CODES[kind], [default]) * self.length
+        texts = column.interner.values if isinstance(column, EncodedColumn) else column
+        parsed = []
+        for text in texts:
+            try:
+                parsed.append(typed_column(kind, [text])[0])
+            except (ValueError, OverflowError):
+                if default is None:
+                    raise ValueError(f"Cannot parse {field} value {text!r}")
+                parsed.append(default)
+        if isinstance(column, EncodedColumn):
+            parsed = [parsed[c] for c in column.codes]
+        return array(ARRAY_CODES[kind], parsed)
+
+    def numpy(self, field):
+        """Zero-copy NumPy view of a numeric column, or of an encoded or packed column's codes or offsets"""
+        if np is None:
+            raise ValueError("NumPy views require numpy (pip install numpy)")
+        column = self.columns[field]
+        if isinstance(column, PackedColumn):
+            return np.frombuffer(column.ends, dtype='int64')
+        buffer = column.codes if isinstance(column, EncodedColumn) else column
+        return np.frombuffer(buffer, dtype=NUMPY_DTYPES[buffer.typecode])
+
+    def value_counts(self, field):
+        """{value: rows} for a string column; empty when the table has no such field"""
+        column = self.columns.get(field)
+        if column is None:
+            return {}
+        if not isinstance(column, EncodedColumn):
+            return dict(Counter(column_text(column_type(field), column)))
+        return {value: int(count) for value, count in zip(column.interner.values, column.counts()) if count}
+
+    def count(self, field, value):
+        """Rows whose `field` has this CSV text"""
+        return self.value_counts(field).get(value, 0)
+
+    def distinct(self, field):
+        """Distinct values of a column, in first-seen order"""
+        return list(self.value_counts(field))
+
+    def group_sum(self, key, values):
+        """{key value: sum of an int buffer over that value's rows}; empty when there is no key column"""
+        column = self.columns.get(key)
+        if column is None:
+            return {}
+        if not isinstance(column, EncodedColumn):
+            sums = Counter()
+            for key_value, value in zip(column_text(column_type(key), column), values):
+                sums[key_value] += value
+            return dict(sums)
+        if np is not None:
+            sums = np.bincount(np.frombuffer(column.codes, dtype='int32'),
+                               weights=np.frombuffer(values, dtype=NUMPY_DTYPES[values.typecode]),
+                               minlength=len(column.interner))
+            sums = np.rint(sums).astype('int64').tolist()
+        else:
+            sums = [0] * len(column.interner)
+            for code, value in zip(column.codes, values):
+                sums[code] += value
+        counts = column.counts()
+        return {value: total for value, total, count in zip(column.interner.values, sums, counts) if count}
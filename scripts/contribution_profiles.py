@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Contribution distribution profiles for the campaign data generator
+
+A profile describes donor categories declaratively - share of donors,
+contributions per donor, amount distribution and date range - in a JSON
+file (or YAML when PyYAML is installed). It is compiled once into
+samplers that the generator's Python and NumPy backends call per donor
+or per chunk, so new data shapes need no code changes.
+
+Profile format:
+
+    {
+      "name": "baseline",
+      "dates": {"start": "2024-01-01", "end": "2024-12-31"},
+      "categories": [
+        {"name": "under_50", "share": "25/150", "contributions": 1,
+         "amount": {"dist": "uniform", "min": 10.00, "max": 49.99}},
+        {"name": "regular", "share": "rest", "contributions": "fill", "ceiling": 3298.00,
+         "first_amount": {"dist": "lognormal", "median": 250, "sigma": 1.0, "min": 5, "max": 2000},
+         "amount": {"dist": "pareto", "scale": 25, "alpha": 1.6, "min": 5, "max": 1000}}
+      ]
+    }
+
+- share: fraction of donors (number or "a/b"); exactly one category uses "rest"
+- contributions: a count, a [min, max] range, or "fill" (exactly one category)
+  to absorb whatever is left of the requested contribution total
+- total: every donor's gifts sum to exactly this amount (last gift is the remainder)
+- ceiling: cumulative cap per donor; later gifts shrink to stay under it
+- amount / first_amount: fixed, uniform, lognormal (median, sigma) or
+  pareto (scale, alpha); draws are clamped to min/max
+- dates: optional per-category override of the profile date range
+"""
+
+import json
+import math
+import random
+from datetime import date
+from fractions import Fraction
+
+try:
+    import numpy as np
+except ImportError:  # only needed by the NumPy sampling methods
+    np = None
+
+try:
+    import yaml
+except ImportError:  # YAML profiles are optional
+    yaml = None
+
+BASELINE_PROFILE = {
+    'name': 'baseline',
+    'dates': {'start': '2024-01-01', 'end': '2024-12-31'},
+    'categories': [
+        {'name': 'single_3300', 'share': '5/150', 'contributions': 1,
+         'amount': {'dist': 'fixed', 'value': 3300.00}},
+        {'name': 'under_50', 'share': '25/150', 'contributions': 1,
+         'amount': {'dist': 'uniform', 'min': 10.00, 'max': 49.99}},
+        {'name': 'over_3299_single', 'share': '4/150', 'contributions': 1,
+         'amount': {'dist': 'uniform', 'min': 3299.01, 'max': 3299.99}},
+        {'name': 'multi_to_3299', 'share': '4/150', 'contributions': [2, 4], 'total': 3299.00,
+         'amount': {'dist': 'uniform', 'min': 500.00, 'max': 1800.00}},
+        # Regular donors stay below the $3,299-$3,300 edge-case categories
+        {'name': 'regular', 'share': 'rest', 'contributions': 'fill', 'ceiling': 3298.00,
+         'first_amount': {'dist': 'uniform', 'min': 100.00, 'max': 2000.00},
+         'amount': {'dist': 'uniform', 'min': 50.00, 'max': 1000.00}},
+    ],
+}
+
+def dollars_to_cents(value):
+    return round(float(value) * 100)
+
+class AmountDistribution:
+    """A compiled amount distribution that draws integer cents within [low, high]"""
+
+    KINDS = ('fixed', 'uniform', 'lognormal', 'pareto')
+
+    def __init__(self, spec):
+        self.kind = spec.get('dist', 'uniform')
+        if self.kind not in self.KINDS:
+            raise ValueError(f"Unknown amount distribution '{self.kind}' (expected one of {self.KINDS})")
+
+        if self.kind == 'fixed':
+            self.min = self.max = dollars_to_cents(spec['value'])
+        else:
+            self.min = dollars_to_cents(spec.get('min', 0.01))
+            self.max = dollars_to_cents(spec['max']) if 'max' in spec else None
+        if self.kind == 'uniform' and self.max is None:
+            raise ValueError("Uniform amount distributions need a max")
+        if self.max is not None and self.max < self.min:
+            raise ValueError(f"Amount max {spec.get('max')} is below min {spec.get('min')}")
+
+        if self.kind == 'lognormal':
+            self.mu = math.log(float(spec['median']))
+            self.sigma = float(spec['sigma'])
+        elif self.kind == 'pareto':
+            self.scale = float(spec['scale'])
+            self.alpha = float(spec['alpha'])
+
+    @property
+    def upper(self):
+        """Largest amount this distribution can produce (unbounded heavy tails count as infinite)"""
+        return self.max if self.max is not None else math.inf
+
+    def draw(self, low, high):
+        """Draw one amount in cents, clamped to [low, high]"""
+        if self.kind == 'fixed' or low >= high:
+            value = self.min
+        elif self.kind == 'uniform':
+            return random.randint(low, high)
+        elif self.kind == 'lognormal':
+            value = round(random.lognormvariate(self.mu, self.sigma) * 100)
+        else:
+            value = round(self.scale * random.paretovariate(self.alpha) * 100)
+        return min(max(value, low), high)
+
+    def np_draw(self, rng, low, high):
+        """Draw one amount per element of the `high` array, clamped to [low, high]"""
+        count = len(high)
+        if self.kind == 'fixed':
+            values = np.full(count, self.min, dtype=np.int64)
+        elif self.kind == 'uniform':
+            return rng.integers(low, np.maximum(high, low) + 1)
+        elif self.kind == 'lognormal':
+            values = np.rint(rng.lognormal(self.mu, self.sigma, count) * 100).astype(np.int64)
+        else:
+            values = np.rint(self.scale * (rng.pareto(self.alpha, count) + 1) * 100).astype(np.int64)
+        return np.minimum(np.maximum(values, low), high)
+
+class ProfileCategory:
+    """One compiled donor category of a contribution profile"""
+
+    def __init__(self, spec, default_dates):
+        self.name = spec['name']
+        share = spec.get('share', 0)
+        self.share = share if share == 'rest' else Fraction(str(share))
+
+        contributions = spec.get('contributions', 1)
+        self.fill = contributions == 'fill'
+        if self.fill:
+            self.min_count, self.max_count = 1, None
+        elif isinstance(contributions, list):
+            self.min_count, self.max_count = int(contributions[0]), int(contributions[1])
+        else:
+            self.min_count = self.max_count = int(contributions)
+        if self.min_count < 1 or (self.max_count is not None and self.max_count < self.min_count):
+            raise ValueError(f"Category '{self.name}' has an invalid contributions setting: {contributions}")
+
+        self.amount = AmountDistribution(spec['amount'])
+        self.first_amount = AmountDistribution(spec['first_amount']) if 'first_amount' in spec else self.amount
+        self.total = dollars_to_cents(spec['total']) if 'total' in spec else None
+        self.ceiling = dollars_to_cents(spec['ceiling']) if 'ceiling' in spec else None
+
+        dates = spec.get('dates', default_dates)
+        self.date_start = date.fromisoformat(dates['start']).toordinal()
+        self.date_span = date.fromisoformat(dates['end']).toordinal() - self.date_start
+        if self.date_span < 0:
+            raise ValueError(f"Category '{self.name}' date range ends before it starts")
+
+    @property
+    def variable(self):
+        """Whether donors in this category differ in how many contributions they make"""
+        return self.fill or self.max_count != self.min_count
+
+    def max_extras(self):
+        """Most contributions beyond min_count one donor can take, or None when unbounded"""
+        if not self.fill:
+            return self.max_count - self.min_count
+        if self.ceiling is None:
+            return None
+        first = self.first_amount.max if self.first_amount.max is not None else self.first_amount.min
+        return max(0, (self.ceiling - first) // self.amount.min)
+
+    def draw_extras_total(self, donors):
+        """Total extra contributions for a ranged category, drawn uniformly per donor"""
+        spread = self.max_count - self.min_count
+        return sum(random.randint(0, spread) for _ in range(donors))
+
+    def sample_cents(self, count):
+        """Amounts in cents for one donor making `count` contributions"""
+        amounts = []
+        remaining = self.total if self.total is not None else self.ceiling
+        for position in range(count):
+            dist = self.first_amount if position == 0 else self.amount
+            left = count - 1 - position
+            if self.total is not None and left == 0:
+                amount = remaining
+            else:
+                high = dist.upper
+                if remaining is not None:
+                    high = min(high, remaining - self.amount.min * left)
+                amount = dist.draw(dist.min, high)
+            amounts.append(amount)
+            if remaining is not None:
+                remaining -= amount
+        return amounts
+
+    def sample_dates(self, count):
+        """Sorted contribution dates (YYYY-MM-DD) for one donor"""
+        ordinals = sorted(self.date_start + random.randint(0, self.date_span) for _ in range(count))
+        return [date.fromordinal(o).isoformat() for o in ordinals]
+
+    def np_sample_cents(self, counts, rng):
+        """Amount matrix (donors x max count, int64 cents) for donors with the given counts"""
+        cents = np.zeros((len(counts), int(counts.max(initial=1))), dtype=np.int64)
+        limit = self.total if self.total is not None else self.ceiling
+        remaining = np.full(len(counts), limit, dtype=np.int64) if limit is not None else None
+        for position in range(cents.shape[1]):
+            rows = np.flatnonzero(counts > position)
+            dist = self.first_amount if position == 0 else self.amount
+            left = counts[rows] - 1 - position
+            high = np.full(len(rows), dist.max if dist.max is not None else np.iinfo(np.int64).max // 4)
+            if remaining is not None:
+                high = np.minimum(high, remaining[rows] - self.amount.min * left)
+            amounts = dist.np_draw(rng, dist.min, high)
+            if self.total is not None:
+                last = left == 0
+                amounts[last] = remaining[rows][last]
+            cents[rows, position] = amounts
+            if remaining is not None:
+                remaining[rows] -= amounts
+        return cents
+
+class ContributionProfile:
+    """A compiled contribution profile: donor categories plus their samplers"""
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.name = spec.get('name', 'custom')
+        default_dates = spec.get('dates', BASELINE_PROFILE['dates'])
+        self.categories = [ProfileCategory(c, default_dates) for c in spec['categories']]
+        self.by_name = {c.name: c for c in self.categories}
+        if len(self.by_name) != len(self.categories):
+            raise ValueError("Profile category names must be unique")
+
+        rest = [c for c in self.categories if c.share == 'rest']
+        fill = [c for c in self.categories if c.fill]
+        if len(rest) != 1 or len(fill) != 1:
+            raise ValueError("A profile needs exactly one 'rest' share and one 'fill' contributions category")
+        self.rest = rest[0]
+        self.fill = fill[0]
+        if sum(c.share for c in self.categories if c is not self.rest) > 1:
+            raise ValueError("Profile category shares add up to more than 1")
+
+    @property
+    def end_ordinal(self):
+        """Last date any category contributes on, as a date ordinal"""
+        return max(c.date_start + c.date_span for c in self.categories)
+
+    def category_sizes(self, donor_count):
+        """Donors per category for a campaign of donor_count donors"""
+        sizes = {c.name: round(c.share * donor_count) for c in self.categories if c is not self.rest}
+        rest = donor_count - sum(sizes.values())
+        if rest < 0:
+            raise ValueError(f"Profile categories need more than {donor_count} donors")
+        sizes[self.rest.name] = rest
+        return {c.name: sizes[c.name] for c in self.categories}
+
+    def np_sample_cents(self, labels, counts, rng):
+        """Amount matrix for donors labelled by category index, one row per donor"""
+        cents = np.zeros((len(labels), int(counts.max(initial=1))), dtype=np.int64)
+        for label, category in enumerate(self.categories):
+            rows = np.flatnonzero(labels == label)
+            if len(rows):
+                block = category.np_sample_cents(counts[rows], rng)
+                cents[rows, :block.shape[1]] = block
+        return cents
+
+    def np_sample_days(self, labels, rng):
+        """Contribution dates as datetime64[D] for contributions labelled by category index"""
+        starts = np.array([c.date_start - date(1970, 1, 1).toordinal() for c in self.categories])
+        spans = np.array([c.date_span for c in self.categories])
+        days = starts[labels] + rng.integers(0, spans[labels] + 1)
+        return days.astype('datetime64[D]')
+
+def load_profile(path=None):
+    """Load and compile a profile from a JSON/YAML file, or the built-in baseline when path is None"""
+    if path is None:
+        return ContributionProfile(BASELINE_PROFILE)
+    with open(path) as f:
+        if path.endswith(('.yaml', '.yml')):
+            if yaml is None:
+                raise ValueError("YAML profiles require PyYAML (pip install pyyaml); use JSON instead")
+            spec = yaml.safe_load(f)
+        else:
+            spec = json.load(f)
+    return ContributionProfile(spec)
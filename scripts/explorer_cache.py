@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+On-disk cache of the explorer's loaded tables and search index
+
+Parsing the exported CSVs and building the search index take up most of a
+search-and-export.py run. ExplorerCache keeps both in a .explorer-cache
+directory inside exported-data/: one pickle per CompactTable and one for
+the SearchIndex (their array, bytearray and NumPy buffers pickle as raw
+bytes), and a small manifest.json recording what they were built from:
+
+- each table's source file name, size, mtime and BLAKE2b hash
+- the source hashes of the tables the search index was built over
+- the BLAKE2b hash of every pickle, checked before it is loaded
+
+A cached table is used while its CSV keeps the same size and mtime. If
+only the mtime changed (a copy or a checkout), the file is hashed and the
+cache is still used when the hash matches. Any other change rebuilds that
+table on the next run, and the index with it.
+
+Unpickling can run arbitrary code. A pickle is only loaded when its hash
+matches the manifest, which catches truncated or swapped files, but
+whoever can write to the cache directory can rewrite the manifest too:
+the exported-data directory must be trusted. Use --no-cache otherwise.
+"""
+
+import gc
+import hashlib
+import json
+import os
+import pickle
+
+from search_index import np
+
+CACHE_DIR = '.explorer-cache'
+MANIFEST_FILE = 'manifest.json'
+INDEX_FILE = 'search-index.pickle'
+# Bump when the pickled table or index layout or the manifest changes
+CACHE_VERSION = 2
+HASH_BLOCK_SIZE = 1 << 20
+
+def file_hash(path):
+    digest = hashlib.blake2b()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+class HashingWriter:
+    """A binary file that hashes what is written to it"""
+
+    def __init__(self, f):
+        self.f = f
+        self.digest = hashlib.blake2b()
+
+    def write(self, data):
+        self.digest.update(data)
+        return self.f.write(data)
+
+def read_pickle(path, digest):
+    """The object pickled at path, or None if it is missing, unreadable or does not hash to digest"""
+    gc.disable()
+    try:
+        if digest is None or file_hash(path) != digest:
+            return None
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None
+    finally:
+        gc.enable()
+
+def write_pickle(path, obj):
+    """Pickle obj to path, returning the hash of the pickle"""
+    gc.disable()
+    try:
+        with open(path + '.tmp', 'wb') as f:
+            writer = HashingWriter(f)
+            pickle.dump(obj, writer, protocol=pickle.HIGHEST_PROTOCOL)
+    finally:
+        gc.enable()
+    os.replace(path + '.tmp', path)
+    return writer.digest.hexdigest()
+
+class ExplorerCache:
+    """Cached tables and search index for one exported-data directory; see the module docstring"""
+
+    def __init__(self, data_dir):
+        self.dir = os.path.join(data_dir, CACHE_DIR)
+        self.manifest_path = os.path.join(self.dir, MANIFEST_FILE)
+        self.manifest = self.read_manifest()
+        # Source hash of each table in use this run, None for a missing file
+        self.sources = {}
+
+    def read_manifest(self):
+        try:
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = None
+        if not isinstance(manifest, dict) or manifest.get('version') != CACHE_VERSION:
+            return {'version': CACHE_VERSION, 'tables': {}, 'index': None, 'index_pickle': None}
+        return manifest
+
+    def table_path(self, dataset):
+        return os.path.join(self.dir, f"{dataset}.pickle")
+
+    def source_hash(self, dataset, path):
+        """Hash of a source file if it still holds what its cached table was built from, else None"""
+        entry = self.manifest['tables'].get(dataset)
+        if entry is None or entry['file'] != os.path.basename(path):
+            return None
+        stat = os.stat(path)
+        if stat.st_size != entry['size']:
+            return None
+        if stat.st_mtime_ns != entry['mtime_ns']:
+            if file_hash(path) != entry['hash']:
+                return None
+            # Same bytes under a new mtime: remember it so the next run skips the hash
+            entry['mtime_ns'] = stat.st_mtime_ns
+            self.save_manifest()
+        return entry['hash']
+
+    def load_table(self, dataset, path):
+        """The cached CompactTable for a dataset's source file, or None if there is none or it is stale"""
+        digest = self.source_hash(dataset, path)
+        if digest is None:
+            return None
+        table = read_pickle(self.table_path(dataset), self.manifest['tables'][dataset]['pickle'])
+        if table is not None:
+            self.sources[dataset] = digest
+        return table
+
+    def save_table(self, dataset, path, table):
+        """Cache a table loaded from a source file, recording the file's size, mtime and hash and the pickle's"""
+        stat = os.stat(path)
+        entry = {'file': os.path.basename(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                 'hash': file_hash(path)}
+        self.sources[dataset] = entry['hash']
+        try:
+            os.makedirs(self.dir, exist_ok=True)
+            entry['pickle'] = write_pickle(self.table_path(dataset), table)
+        except OSError as e:
+            print(f"⚠️  Could not cache {dataset}: {e}")
+            return
+        self.manifest['tables'][dataset] = entry
+        self.save_manifest()
+
+    def missing_table(self, dataset):
+        """Record that a dataset has no source file this run"""
+        self.sources[dataset] = None
+
+    def index_key(self):
+        # An index built with NumPy holds NumPy arrays, so it is only reused with NumPy, and vice versa
+        return {'tables': dict(self.sources), 'numpy': np is not None}
+
+    def load_index(self, tables):
+        """The cached SearchIndex, attached to the tables, if it was built over these exact sources"""
+        if self.manifest['index'] != self.index_key():
+            return None
+        index = read_pickle(os.path.join(self.dir, INDEX_FILE), self.manifest['index_pickle'])
+        if index is not None:
+            index.attach(tables)
+        return index
+
+    def save_index(self, index):
+        try:
+            os.makedirs(self.dir, exist_ok=True)
+            pickle_hash = write_pickle(os.path.join(self.dir, INDEX_FILE), index)
+        except OSError as e:
+            print(f"⚠️  Could not cache the search index: {e}")
+            return
+        self.manifest['index'] = self.index_key()
+        self.manifest['index_pickle'] = pickle_hash
+        self.save_manifest()
+
+    def save_manifest(self):
+        try:
+            os.makedirs(self.dir, exist_ok=True)
+            with open(self.manifest_path + '.tmp', 'w') as f:
+                json.dump(self.manifest, f, indent=2)
+            os.replace(self.manifest_path + '.tmp', self.manifest_path)
+        except OSError as e:
+            print(f"⚠️  Could not update the cache manifest: {e}")
@@ -3,10 +3,24 @@
 Generate clean campaign data tables with proper validation
 """
 
-import csv
+import argparse
+import json
+import math
+import os
 import random
+import shutil
 import string
-from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+
+from contribution_profiles import BASELINE_PROFILE, ContributionProfile, load_profile
+from table_io import (DEFAULT_CHUNK_SIZE, FORMATS, find_table, format_cents, iter_rows,
+                      open_table_writer, table_path)
+
+try:
+    import numpy as np
+except ImportError:  # numpy is only needed for --backend numpy
+    np = None
 
 # Lists for generating realistic data
 first_names = [
@@ -85,92 +99,242 @@ occupations = [
     "Regional Manager", "Product Manager", "Creative Director", "Site Supervisor", "Partner"
 ]
 
-def generate_unique_id():
-    """Generate 8-character alphanumeric ID"""
-    return ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
+street_names = ["Oak", "Pine", "Elm", "Maple", "Cedar", "Birch", "Spruce", "Willow", "Ash", "Poplar"]
+street_types = ["Street", "Avenue", "Drive", "Lane", "Road", "Court", "Way", "Boulevard", "Place", "Circle"]
+apt_types = ["Apt", "Suite", "Unit", "Floor"]
+apt_letters = ['', 'A', 'B', 'C', 'D']
+
+PROSPECT_FIELDS = ['unique_id', 'first_name', 'last_name', 'phone_number', 'employer',
+                   'occupation', 'address_line_1', 'address_line_2', 'city', 'state', 'zip', 'wallet_address']
+DONOR_FIELDS = PROSPECT_FIELDS + ['contribution_amount', 'contribution_date', 'contribution_number']
+KYC_FIELDS = ['unique_id', 'first_name', 'last_name', 'kyc_status']
+# One row per donor: enough to append new contributions without re-reading donors.csv
+LEDGER_FIELDS = PROSPECT_FIELDS + ['category', 'contribution_count', 'total_cents', 'last_date']
+CAMPAIGN_META = 'campaign.json'
+
+# Baseline campaign shape (scale mode reads the same mix from contribution_profiles.BASELINE_PROFILE)
+CATEGORY_SIZES = {
+    'single_3300': 5,
+    'under_50': 25,
+    'over_3299_single': 4,
+    'multi_to_3299': 4,
+}
+FEC_LIMIT_CENTS = 330000
+# Regular donors stay below the $3,299-$3,300 edge-case categories
+REGULAR_CEILING_CENTS = 329800
+
+ID_ALPHABET = string.ascii_uppercase + string.digits
+ID_LENGTH = 8
+PHONE_LINES = 9000
+WALLET_COUNTER_BITS = 32
 
-def generate_wallet_address():
-    """Generate valid Ethereum wallet address (0x + 40 hex chars)"""
-    hex_chars = '0123456789abcdef'
-    return '0x' + ''.join(random.choices(hex_chars, k=40))
+def affine_permutation(modulus, rng):
+    """Return (multiplier, offset) so that i -> (multiplier * i + offset) % modulus is a bijection"""
+    while True:
+        multiplier = rng.randrange(modulus // 3, modulus)
+        if math.gcd(multiplier, modulus) == 1:
+            return multiplier, rng.randrange(modulus)
 
-def generate_phone():
-    """Generate phone number"""
-    return f"555-{random.randint(1000, 9999)}"
+def middle_initials(rounds):
+    """Suffix that keeps names unique after the base name space is used up: '', ' A.', ' B.', ... ' AA.'"""
+    initials = ''
+    while rounds:
+        rounds, letter = divmod(rounds - 1, 26)
+        initials = string.ascii_uppercase[letter] + initials
+    return f" {initials}." if initials else ''
+
+class IdentityAllocator:
+    """Allocate IDs, names, phones and wallets that are unique by construction.
+
+    Every person gets the next counter value, and each field is a bijective
+    function of that counter, so uniqueness costs O(1) per person and never
+    needs a lookup set. Name and phone spaces widen deterministically once
+    the base lists are exhausted: a middle initial is added to the first
+    name, and phones move from 555-XXXX to area-code numbers.
+    """
+
+    def __init__(self, start=0, rng=random):
+        self.counter = start
+        self.rng = rng
+        self.id_space = len(ID_ALPHABET) ** ID_LENGTH
+        self.name_space = len(first_names) * len(last_names)
+        self.id_perm = affine_permutation(self.id_space, rng)
+        self.name_perm = affine_permutation(self.name_space, rng)
+        self.phone_perm = affine_permutation(PHONE_LINES, rng)
+        self.wallet_perm = affine_permutation(2 ** WALLET_COUNTER_BITS, rng)
+
+    def __getstate__(self):
+        # The random module cannot be pickled; shard workers use their own, seeded per shard
+        state = dict(self.__dict__)
+        if state['rng'] is random:
+            state['rng'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.rng is None:
+            self.rng = random
+    
+    def unique_id(self, index):
+        """8-character alphanumeric ID"""
+        multiplier, offset = self.id_perm
+        value = (multiplier * index + offset) % self.id_space
+        chars = []
+        for _ in range(ID_LENGTH):
+            value, digit = divmod(value, len(ID_ALPHABET))
+            chars.append(ID_ALPHABET[digit])
+        return ''.join(chars)
+    
+    def name(self, index):
+        """(first, last) pair; later rounds add a middle initial to the first name"""
+        rounds, position = divmod(index, self.name_space)
+        multiplier, offset = self.name_perm
+        pair = (multiplier * position + offset) % self.name_space
+        last_index, first_index = divmod(pair, len(first_names))
+        first = first_names[first_index] + middle_initials(rounds)
+        return first, last_names[last_index]
+    
+    def phone(self, index):
+        """555-XXXX for the first 9,000 people, then NXX-XXX-XXXX numbers"""
+        block, position = divmod(index, PHONE_LINES)
+        multiplier, offset = self.phone_perm
+        line = 1000 + (multiplier * position + offset) % PHONE_LINES
+        if block == 0:
+            return f"555-{line}"
+        exchange, area = divmod(block - 1, 800)
+        return f"{200 + area}-{555 + exchange:03d}-{line}"
+    
+    def wallet(self, index):
+        """Ethereum wallet address (0x + 40 hex chars) ending in a permuted counter"""
+        multiplier, offset = self.wallet_perm
+        tag = (multiplier * index + offset) % (2 ** WALLET_COUNTER_BITS)
+        return f"0x{self.rng.getrandbits(128):032x}{tag:08x}"
+    
+    def allocate(self):
+        """Return (unique_id, first, last, phone, wallet) for the next person"""
+        index = self.counter
+        self.counter += 1
+        first, last = self.name(index)
+        return self.unique_id(index), first, last, self.phone(index), self.wallet(index)
 
 def generate_address():
     """Generate random address"""
     street_num = random.randint(100, 999)
-    street_names = ["Oak", "Pine", "Elm", "Maple", "Cedar", "Birch", "Spruce", "Willow", "Ash", "Poplar"]
-    street_types = ["Street", "Avenue", "Drive", "Lane", "Road", "Court", "Way", "Boulevard", "Place", "Circle"]
     street = f"{street_num} {random.choice(street_names)} {random.choice(street_types)}"
     
     # 30% chance of apartment/unit
     apt = ""
     if random.random() < 0.3:
-        apt_types = ["Apt", "Suite", "Unit", "Floor"]
-        apt = f"{random.choice(apt_types)} {random.randint(1, 20)}{random.choice(['', 'A', 'B', 'C', 'D'])}"
+        apt = f"{random.choice(apt_types)} {random.randint(1, 20)}{random.choice(apt_letters)}"
     
     return street, apt
 
-def generate_prospects():
+def generate_person(allocator):
+    """Generate one person record with ID, name, phone and wallet unique within the allocator"""
+    unique_id, first, last, phone, wallet = allocator.allocate()
+    
+    # Generate address
+    street, apt = generate_address()
+    city, state, zip_code = random.choice(cities)
+    
+    return {
+        'unique_id': unique_id,
+        'first_name': first,
+        'last_name': last,
+        'phone_number': phone,
+        'employer': random.choice(companies),
+        'occupation': random.choice(occupations),
+        'address_line_1': street,
+        'address_line_2': apt,
+        'city': city,
+        'state': state,
+        'zip': zip_code,
+        'wallet_address': wallet
+    }
+
+def generate_prospects(allocator):
     """Generate 150 unique prospects"""
     prospects = []
-    used_ids = set()
-    used_names = set()
-    used_phones = set()
-    used_wallets = set()
     
     while len(prospects) < 150:
-        # Generate unique ID
-        unique_id = generate_unique_id()
-        while unique_id in used_ids:
-            unique_id = generate_unique_id()
-        used_ids.add(unique_id)
-        
-        # Generate unique name
-        first = random.choice(first_names)
-        last = random.choice(last_names)
-        while (first, last) in used_names:
-            first = random.choice(first_names)
-            last = random.choice(last_names)
-        used_names.add((first, last))
-        
-        # Generate unique phone
-        phone = generate_phone()
-        while phone in used_phones:
-            phone = generate_phone()
-        used_phones.add(phone)
-        
-        # Generate unique wallet
-        wallet = generate_wallet_address()
-        while wallet in used_wallets:
-            wallet = generate_wallet_address()
-        used_wallets.add(wallet)
-        
-        # Generate address
-        street, apt = generate_address()
-        city, state, zip_code = random.choice(cities)
-        
-        prospects.append({
-            'unique_id': unique_id,
-            'first_name': first,
-            'last_name': last,
-            'phone_number': phone,
-            'employer': random.choice(companies),
-            'occupation': random.choice(occupations),
-            'address_line_1': street,
-            'address_line_2': apt,
-            'city': city,
-            'state': state,
-            'zip': zip_code,
-            'wallet_address': wallet
-        })
+        prospects.append(generate_person(allocator))
     
     return prospects
 
-def generate_donors(prospects):
-    """Generate 150 unique donors with 215 contributions, 38 from prospects"""
+def partition(items, sizes, shuffle=True):
+    """Split items into consecutive groups of the given sizes plus the leftover.
+
+    One shuffle followed by slicing replaces repeated sample-then-filter
+    passes, so partitioning is linear in the number of items.
+    """
+    if shuffle:
+        items = list(items)
+        random.shuffle(items)
+    groups = []
+    start = 0
+    for size in sizes:
+        groups.append(items[start:start + size])
+        start += size
+    groups.append(items[start:])
+    return groups
+
+def to_cents(amount):
+    """Convert a dollar amount (float or string) to integer cents"""
+    return round(float(amount) * 100)
+
+class DonorLedger:
+    """Running per-donor contribution totals with an O(1)-sampling pool of donors who can give again.
+
+    A donor stays in the eligible pool while their total is below
+    topup_floor, leaving at least $50 of headroom under limit for a top-up.
+    """
+
+    def __init__(self, limit=REGULAR_CEILING_CENTS, topup_floor=300000):
+        self.limit = limit
+        self.topup_floor = topup_floor
+        self.totals = {}
+        self.counts = {}
+        self.eligible = []
+        self.positions = {}
+    
+    def record(self, donor, cents):
+        donor_id = donor['unique_id']
+        total = self.totals.get(donor_id, 0) + cents
+        self.totals[donor_id] = total
+        self.counts[donor_id] = self.counts.get(donor_id, 0) + 1
+        
+        in_pool = donor_id in self.positions
+        if total < self.topup_floor and not in_pool:
+            self.positions[donor_id] = len(self.eligible)
+            self.eligible.append(donor)
+        elif total >= self.topup_floor and in_pool:
+            # Swap-remove keeps the pool contiguous for O(1) sampling
+            position = self.positions.pop(donor_id)
+            last = self.eligible.pop()
+            if position < len(self.eligible):
+                self.eligible[position] = last
+                self.positions[last['unique_id']] = position
+    
+    def total(self, donor_id):
+        return self.totals.get(donor_id, 0)
+    
+    def count(self, donor_id):
+        return self.counts.get(donor_id, 0)
+    
+    def headroom(self, donor_id):
+        return self.limit - self.total(donor_id)
+    
+    def has_eligible(self):
+        return bool(self.eligible)
+    
+    def sample_eligible(self):
+        return random.choice(self.eligible)
+
+def generate_donors(prospects, allocator, categories=None):
+    """Generate 150 unique donors with 215 contributions, 38 from prospects.
+
+    When a categories dict is given it is filled with each donor's category.
+    """
     donors = []
     contributions = []
     
@@ -178,74 +342,26 @@ def generate_donors(prospects):
     prospect_donors = random.sample(prospects, 38)
     
     # MUST generate exactly 112 new donors (150 total - 38 from prospects)
+    # The shared allocator keeps them distinct from every prospect
     new_donors = []
-    used_ids = set([p['unique_id'] for p in prospects])
-    used_names = set([(p['first_name'], p['last_name']) for p in prospects])
-    used_phones = set([p['phone_number'] for p in prospects])
-    used_wallets = set([p['wallet_address'] for p in prospects])
     
     while len(new_donors) < 112:
-        # Generate unique ID
-        unique_id = generate_unique_id()
-        while unique_id in used_ids:
-            unique_id = generate_unique_id()
-        used_ids.add(unique_id)
-        
-        # Generate unique name
-        first = random.choice(first_names)
-        last = random.choice(last_names)
-        while (first, last) in used_names:
-            first = random.choice(first_names)
-            last = random.choice(last_names)
-        used_names.add((first, last))
-        
-        # Generate unique phone
-        phone = generate_phone()
-        while phone in used_phones:
-            phone = generate_phone()
-        used_phones.add(phone)
-        
-        # Generate unique wallet
-        wallet = generate_wallet_address()
-        while wallet in used_wallets:
-            wallet = generate_wallet_address()
-        used_wallets.add(wallet)
-        
-        # Generate address
-        street, apt = generate_address()
-        city, state, zip_code = random.choice(cities)
-        
-        new_donors.append({
-            'unique_id': unique_id,
-            'first_name': first,
-            'last_name': last,
-            'phone_number': phone,
-            'employer': random.choice(companies),
-            'occupation': random.choice(occupations),
-            'address_line_1': street,
-            'address_line_2': apt,
-            'city': city,
-            'state': state,
-            'zip': zip_code,
-            'wallet_address': wallet
-        })
+        new_donors.append(generate_person(allocator))
     
     # Combine all donors
     all_donors = prospect_donors + new_donors
     random.shuffle(all_donors)
     
-    # Track contribution rules
-    single_3300 = random.sample(all_donors, 5)
-    remaining = [d for d in all_donors if d not in single_3300]
-    
-    under_50 = random.sample(remaining, 25)
-    remaining = [d for d in remaining if d not in under_50]
-    
-    over_3299_single = random.sample(remaining, 4)
-    remaining = [d for d in remaining if d not in over_3299_single]
-    
-    multi_to_3299 = random.sample(remaining, 4)
-    remaining = [d for d in remaining if d not in multi_to_3299]
+    # Track contribution rules (all_donors is already shuffled, so slicing is a fair draw)
+    single_3300, under_50, over_3299_single, multi_to_3299, remaining = partition(
+        all_donors,
+        [CATEGORY_SIZES['single_3300'], CATEGORY_SIZES['under_50'],
+         CATEGORY_SIZES['over_3299_single'], CATEGORY_SIZES['multi_to_3299']],
+        shuffle=False)
+    if categories is not None:
+        groups = [single_3300, under_50, over_3299_single, multi_to_3299, remaining]
+        for name, group in zip(list(CATEGORY_SIZES) + ['regular'], groups):
+            categories.update((donor['unique_id'], name) for donor in group)
     
     # Generate contributions
     base_date = datetime(2024, 1, 1)
@@ -304,7 +420,8 @@ def generate_donors(prospects):
     
     # Fill remaining contributions to reach exactly 215 total
     # Use ALL remaining donors to ensure we have 150 unique donors total
-    contributions_needed = 215 - len(contributions)
+    # Only these regular donors take top-ups so the fixed categories stay exact
+    ledger = DonorLedger()
     
     # First, give each remaining donor at least one contribution
     for donor in remaining:
@@ -316,33 +433,21 @@ def generate_donors(prospects):
                 'contribution_date': (base_date + timedelta(days=random.randint(0, 365))).strftime('%Y-%m-%d'),
                 'contribution_number': '1'
             })
+            ledger.record(donor, to_cents(amount))
     
     # If we still need more contributions, add second contributions to some donors
-    while len(contributions) < 215:
-        # Pick random donors who can receive additional contributions
-        eligible_donors = []
-        for donor in all_donors:
-            donor_contribs = [c for c in contributions if c['unique_id'] == donor['unique_id']]
-            if donor_contribs:
-                current_total = sum(float(c['contribution_amount']) for c in donor_contribs)
-                if current_total < 3000:  # Leave room for additional contribution
-                    eligible_donors.append(donor)
+    while len(contributions) < 215 and ledger.has_eligible():
+        donor = ledger.sample_eligible()
+        max_additional = min(100000, ledger.headroom(donor['unique_id']))
+        cents = random.randint(5000, max_additional)
         
-        if eligible_donors:
-            donor = random.choice(eligible_donors)
-            donor_contribs = [c for c in contributions if c['unique_id'] == donor['unique_id']]
-            current_total = sum(float(c['contribution_amount']) for c in donor_contribs)
-            max_additional = min(1000, 3300 - current_total)
-            amount = round(random.uniform(50, max_additional), 2)
-            
-            contributions.append({
-                **donor,
-                'contribution_amount': f'{amount:.2f}',
-                'contribution_date': (base_date + timedelta(days=random.randint(0, 365))).strftime('%Y-%m-%d'),
-                'contribution_number': str(len(donor_contribs) + 1)
-            })
-        else:
-            break
+        contributions.append({
+            **donor,
+            'contribution_amount': format_cents(cents),
+            'contribution_date': (base_date + timedelta(days=random.randint(0, 365))).strftime('%Y-%m-%d'),
+            'contribution_number': str(ledger.count(donor['unique_id']) + 1)
+        })
+        ledger.record(donor, cents)
     
     # Sort by date
     contributions.sort(key=lambda x: x['contribution_date'])
@@ -354,8 +459,11 @@ def generate_kyc(prospects, donor_ids):
     kyc = []
     
     # Ensure all donors pass KYC
-    donors_in_prospects = [p for p in prospects if p['unique_id'] in donor_ids]
-    non_donors = [p for p in prospects if p['unique_id'] not in donor_ids]
+    donor_ids = set(donor_ids)
+    donors_in_prospects = []
+    non_donors = []
+    for p in prospects:
+        (donors_in_prospects if p['unique_id'] in donor_ids else non_donors).append(p)
     
     # All donors get Yes
     for donor in donors_in_prospects:
@@ -367,8 +475,7 @@ def generate_kyc(prospects, donor_ids):
         })
     
     # Select 11 non-donors to fail KYC
-    kyc_fail = random.sample(non_donors, min(11, len(non_donors)))
-    kyc_pass = [p for p in non_donors if p not in kyc_fail]
+    kyc_fail, kyc_pass = partition(non_donors, [min(11, len(non_donors))])
     
     for prospect in kyc_fail:
         kyc.append({
@@ -391,27 +498,680 @@ def generate_kyc(prospects, donor_ids):
     
     return kyc
 
-def save_csv(filename, data, fieldnames):
-    """Save data to CSV file"""
-    with open(filename, 'w', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(data)
+class CategorySelector:
+    """Assign exact per-category counts over a stream of known length.
+
+    Selection sampling: each draw picks a label with probability
+    remaining[label] / remaining_total, so the totals come out exact
+    without ever holding the population in memory.
+    """
+
+    def __init__(self, total, counts):
+        if sum(counts.values()) > total:
+            raise ValueError(f"Category sizes {counts} exceed population of {total}")
+        self.remaining = dict(counts)
+        self.remaining[None] = total - sum(counts.values())
+        self.left = total
+
+    def draw(self):
+        r = random.randrange(self.left)
+        self.left -= 1
+        for label, count in self.remaining.items():
+            if r < count:
+                self.remaining[label] -= 1
+                return label
+            r -= count
+
+class EvenAllocator:
+    """Spread a fixed total over a stream of slots, each slot getting floor or ceil of the mean"""
+
+    def __init__(self, total, slots):
+        self.total = total
+        self.slots = slots
+
+    def draw(self):
+        base, extra = divmod(self.total, self.slots)
+        share = base + (1 if random.randrange(self.slots) < extra else 0)
+        self.total -= share
+        self.slots -= 1
+        return share
+
+def donor_contributions(donor, amounts, dates):
+    """Yield the contribution rows for one donor, numbered in date order"""
+    for number, (cents, day) in enumerate(zip(amounts, dates), 1):
+        yield {
+            **donor,
+            'contribution_amount': format_cents(cents),
+            'contribution_date': day,
+            'contribution_number': str(number)
+        }
+
+def ledger_entry(donor, category, count, total_cents, last_date):
+    """The persisted ledger row for one donor"""
+    entry = {field: donor[field] for field in PROSPECT_FIELDS}
+    entry.update({
+        'category': category,
+        'contribution_count': str(count),
+        'total_cents': str(total_cents),
+        'last_date': last_date
+    })
+    return entry
+
+def build_ledger(contributions, categories):
+    """Ledger rows for an in-memory contribution list, given each donor's category"""
+    totals = {}
+    for row in contributions:
+        donor_id = row['unique_id']
+        count, total, last_date, donor = totals.get(donor_id, (0, 0, '', row))
+        totals[donor_id] = (count + 1, total + to_cents(row['contribution_amount']),
+                            max(last_date, row['contribution_date']), donor)
+    return [ledger_entry(donor, categories[donor_id], count, total, last_date)
+            for donor_id, (count, total, last_date, donor) in totals.items()]
+
+def plan_campaign(prospect_count, donor_count, contribution_count, overlap, kyc_fail, profile=None):
+    """Validate the requested campaign shape and fix every global count up front.
+
+    The plan records how many rows of each kind to produce, how many donors
+    fall in each profile category, how many contributions beyond their
+    minimum each variable category absorbs, and which allocator counter
+    range to use; shards get slices of it from split_plan().
+    """
+    profile = profile or load_profile()
+    if overlap > min(prospect_count, donor_count):
+        raise ValueError("Overlap cannot exceed the prospect or donor count")
+    if kyc_fail > prospect_count - overlap:
+        raise ValueError("KYC failures must come from non-donor prospects")
+    
+    sizes = profile.category_sizes(donor_count)
+    extras = {}
+    for category in profile.categories:
+        if category.variable and not category.fill:
+            extras[category.name] = category.draw_extras_total(sizes[category.name])
+    
+    # The fill category absorbs whatever the requested total still needs
+    fill = profile.fill
+    fill_donors = sizes[fill.name]
+    base = sum(sizes[c.name] * c.min_count for c in profile.categories)
+    fill_extras = contribution_count - base - sum(extras.values())
+    max_extras = fill.max_extras()
+    if fill_extras < 0 or (fill_extras and not fill_donors):
+        raise ValueError(f"{contribution_count} contributions cannot cover {donor_count} donors")
+    if max_extras is not None and fill_extras > fill_donors * max_extras:
+        raise ValueError(f"{contribution_count} contributions would push '{fill.name}' donors past their ceiling")
+    extras[fill.name] = fill_extras
+    
+    return {
+        'profile': profile,
+        'allocator': IdentityAllocator(),
+        'prospect_start': 0,
+        'prospects': prospect_count,
+        'new_donor_start': prospect_count,
+        'new_donors': donor_count - overlap,
+        'overlap': overlap,
+        'kyc_fail': kyc_fail,
+        'categories': sizes,
+        'extras': extras,
+    }
+
+def plan_donor_count(plan):
+    return plan['overlap'] + plan['new_donors']
+
+def apportion(counts, share, population):
+    """Largest-remainder split of counts (summing to population) for a slice of `share` members"""
+    if share == population:
+        return dict(counts)
+    parts = {}
+    remainders = []
+    for key, count in counts.items():
+        parts[key], remainder = divmod(count * share, population) if population else (0, 0)
+        remainders.append((remainder, key))
+    leftover = share - sum(parts.values())
+    for _, key in sorted(remainders, key=lambda r: r[0], reverse=True)[:leftover]:
+        parts[key] += 1
+    return parts
+
+def split_plan(plan, shards):
+    """Split a campaign plan into shards with disjoint ID ranges and exact global counts"""
+    if shards == 1:
+        return [plan]
+    
+    left = dict(plan)
+    left['categories'] = dict(plan['categories'])
+    left['extras'] = dict(plan['extras'])
+    shard_plans = []
+    for shard in range(shards):
+        prospects = plan['prospects'] * (shard + 1) // shards - plan['prospects'] * shard // shards
+        new_donors = plan['new_donors'] * (shard + 1) // shards - plan['new_donors'] * shard // shards
+        
+        overlap = apportion({'in': left['overlap'], 'out': left['prospects'] - left['overlap']},
+                            prospects, left['prospects'])['in']
+        non_donors_left = left['prospects'] - left['overlap']
+        kyc_fail = apportion({'fail': left['kyc_fail'], 'pass': non_donors_left - left['kyc_fail']},
+                             prospects - overlap, non_donors_left)['fail']
+        
+        donors_left = plan_donor_count(left)
+        categories = apportion(left['categories'], overlap + new_donors, donors_left)
+        
+        # Extras split in proportion to category donors, never beyond what they can hold
+        extras = {}
+        for name, extra in left['extras'].items():
+            capacity = plan['profile'].by_name[name].max_extras()
+            if capacity is None:
+                capacity = max(extra, 1)
+            extras[name] = apportion({'extra': extra, 'slack': capacity * left['categories'][name] - extra},
+                                     capacity * categories[name],
+                                     capacity * left['categories'][name])['extra']
+        
+        shard_plans.append({
+            'profile': plan['profile'],
+            'allocator': plan['allocator'],
+            'prospect_start': left['prospect_start'],
+            'prospects': prospects,
+            'new_donor_start': left['new_donor_start'],
+            'new_donors': new_donors,
+            'overlap': overlap,
+            'kyc_fail': kyc_fail,
+            'categories': categories,
+            'extras': extras,
+        })
+        
+        left['prospect_start'] += prospects
+        left['prospects'] -= prospects
+        left['new_donor_start'] += new_donors
+        left['new_donors'] -= new_donors
+        left['overlap'] -= overlap
+        left['kyc_fail'] -= kyc_fail
+        for name, size in categories.items():
+            left['categories'][name] -= size
+        for name, extra in extras.items():
+            left['extras'][name] -= extra
+    return shard_plans
+
+def generate_campaign_stream(plan):
+    """Yield (table, row) pairs for a campaign plan of any size.
+
+    Rows are produced one at a time: prospects, their KYC records and the
+    contributions of prospects who donate are emitted together, followed by
+    the new (non-prospect) donors. Category and KYC assignment use selection
+    sampling so the counts are exact without holding the population.
+    Contributions are grouped by donor rather than sorted by date, and each
+    donor's contributions are followed by its ledger row.
+    """
+    profile = plan['profile']
+    prospect_count = plan['prospects']
+    overlap = plan['overlap']
+    sizes = plan['categories']
+    
+    categories = CategorySelector(plan_donor_count(plan), sizes)
+    extra_allocators = {name: EvenAllocator(extra, max(sizes[name], 1)) for name, extra in plan['extras'].items()}
+    is_donor = CategorySelector(prospect_count, {True: overlap})
+    fails_kyc = CategorySelector(prospect_count - overlap, {True: plan['kyc_fail']})
+    
+    allocator = plan['allocator']
+    allocator.counter = plan['prospect_start']
+    
+    def contributions_for(donor):
+        name = categories.draw()
+        category = profile.by_name[name]
+        count = category.min_count
+        if name in extra_allocators:
+            count += extra_allocators[name].draw()
+        amounts = category.sample_cents(count)
+        dates = category.sample_dates(count)
+        for row in donor_contributions(donor, amounts, dates):
+            yield 'donors', row
+        yield 'ledger', ledger_entry(donor, name, count, sum(amounts), dates[-1])
+    
+    for _ in range(prospect_count):
+        prospect = generate_person(allocator)
+        yield 'prospects', prospect
+        
+        donates = is_donor.draw()
+        if donates:
+            kyc_status = 'Yes'
+        else:
+            kyc_status = 'No' if fails_kyc.draw() else 'Yes'
+        yield 'kyc', {
+            'unique_id': prospect['unique_id'],
+            'first_name': prospect['first_name'],
+            'last_name': prospect['last_name'],
+            'kyc_status': kyc_status
+        }
+        
+        if donates:
+            yield from contributions_for(prospect)
+    
+    allocator.counter = plan['new_donor_start']
+    for _ in range(plan['new_donors']):
+        donor = generate_person(allocator)
+        yield from contributions_for(donor)
+
+def np_mulmod(multiplier, values, modulus):
+    """(multiplier * values) % modulus for int64 arrays without overflow (modulus < 2**42)"""
+    high, low = divmod(multiplier, 1 << 20)
+    return ((high * values % modulus) * (1 << 20) % modulus + low * values) % modulus
+
+def np_random_mask(size, selected, rng):
+    """Boolean mask with exactly `selected` randomly placed True values"""
+    mask = np.zeros(size, dtype=bool)
+    mask[rng.permutation(size)[:selected]] = True
+    return mask
+
+def np_even_shares(state, slots, rng):
+    """Vectorised EvenAllocator: draw the next `slots` shares of state = [total, slots_left]"""
+    total, slots_left = state
+    if slots == 0:
+        return np.zeros(0, dtype=np.int64)
+    base, extra = divmod(total, slots_left)
+    ceil_count = rng.hypergeometric(extra, slots_left - extra, slots) if extra else 0
+    shares = base + np_random_mask(slots, ceil_count, rng).astype(np.int64)
+    state[0] -= int(shares.sum())
+    state[1] -= slots
+    return shares
+
+def np_people(allocator, start, count, rng):
+    """Build a chunk of person columns for counter values start .. start + count"""
+    index = np.arange(start, start + count, dtype=np.int64)
+    
+    # Base-36 IDs from the allocator's permutation, least significant digit first
+    multiplier, offset = allocator.id_perm
+    value = (np_mulmod(multiplier, index, allocator.id_space) + offset) % allocator.id_space
+    codes = np.empty((count, ID_LENGTH), dtype=np.uint8)
+    for position in range(ID_LENGTH):
+        value, codes[:, position] = np.divmod(value, len(ID_ALPHABET))
+    alphabet = np.frombuffer(ID_ALPHABET.encode(), dtype=np.uint8)
+    unique_ids = alphabet[codes].view(f'S{ID_LENGTH}').ravel().astype(str)
+    
+    # Names
+    rounds, position = np.divmod(index, allocator.name_space)
+    multiplier, offset = allocator.name_perm
+    last_index, first_index = np.divmod((multiplier * position + offset) % allocator.name_space,
+                                        len(first_names))
+    first = np.array(first_names, dtype=object)[first_index]
+    for name_round in np.unique(rounds):
+        if name_round:
+            first[rounds == name_round] += middle_initials(int(name_round))
+    last = np.array(last_names, dtype=object)[last_index]
+    
+    # Phones, with the area-code prefix resolved once per 9,000-number block
+    block, position = np.divmod(index, PHONE_LINES)
+    multiplier, offset = allocator.phone_perm
+    line = 1000 + (multiplier * position + offset) % PHONE_LINES
+    blocks, block_index = np.unique(block, return_inverse=True)
+    prefixes = np.array([allocator.phone(int(b) * PHONE_LINES)[:-4] for b in blocks], dtype=object)
+    phones = prefixes[block_index] + line.astype(str).astype(object)
+    
+    # Wallets: 16 random bytes plus the big-endian permuted counter tag
+    multiplier, offset = allocator.wallet_perm
+    tag = (index.astype(np.uint64) * np.uint64(multiplier) + np.uint64(offset)) & np.uint64(0xffffffff)
+    raw = np.empty((count, 20), dtype=np.uint8)
+    raw[:, :16] = rng.integers(0, 256, (count, 16), dtype=np.uint8)
+    raw[:, 16:] = tag.astype('>u4').view(np.uint8).reshape(count, 4)
+    hex_digits = raw.tobytes().hex()
+    wallets = np.array(['0x' + hex_digits[i:i + 40] for i in range(0, 40 * count, 40)], dtype=object)
+    
+    # Addresses
+    streets = (rng.integers(100, 1000, count).astype(str).astype(object) + ' '
+               + np.array(street_names, dtype=object)[rng.integers(0, len(street_names), count)] + ' '
+               + np.array(street_types, dtype=object)[rng.integers(0, len(street_types), count)])
+    has_apt = rng.random(count) < 0.3
+    apts = np.full(count, '', dtype=object)
+    apt_count = int(has_apt.sum())
+    apts[has_apt] = (np.array(apt_types, dtype=object)[rng.integers(0, len(apt_types), apt_count)] + ' '
+                     + rng.integers(1, 21, apt_count).astype(str).astype(object)
+                     + np.array(apt_letters, dtype=object)[rng.integers(0, len(apt_letters), apt_count)])
+    city_index = rng.integers(0, len(cities), count)
+    
+    return {
+        'unique_id': unique_ids,
+        'first_name': first,
+        'last_name': last,
+        'phone_number': phones,
+        'employer': np.array(companies, dtype=object)[rng.integers(0, len(companies), count)],
+        'occupation': np.array(occupations, dtype=object)[rng.integers(0, len(occupations), count)],
+        'address_line_1': streets,
+        'address_line_2': apts,
+        'city': np.array([c[0] for c in cities], dtype=object)[city_index],
+        'state': np.array([c[1] for c in cities], dtype=object)[city_index],
+        'zip': np.array([c[2] for c in cities], dtype=object)[city_index],
+        'wallet_address': wallets
+    }
+
+def np_contribution_columns(people, donor_rows, labels, counts, profile, rng):
+    """Expand donors into contribution columns, numbered in date order within each donor.
+
+    Returns (contribution columns, ledger columns with one row per donor).
+    """
+    cents = profile.np_sample_cents(labels, counts, rng)
+    flat_cents = cents[np.arange(cents.shape[1]) < counts[:, None]]
+    owner = np.repeat(donor_rows, counts)
+    group = np.repeat(np.arange(len(donor_rows)), counts)
+    
+    days = profile.np_sample_days(np.repeat(labels, counts), rng)
+    days = days[np.lexsort((days, group))]
+    starts = np.cumsum(counts) - counts
+    numbers = np.arange(len(flat_cents)) - np.repeat(starts, counts) + 1
+    
+    dollars, remainder = np.divmod(flat_cents, 100)
+    cent_suffix = np.array([f'.{c:02d}' for c in range(100)], dtype=object)
+    
+    columns = {field: people[field][owner] for field in PROSPECT_FIELDS}
+    columns['contribution_amount'] = dollars.astype(str).astype(object) + cent_suffix[remainder]
+    columns['contribution_date'] = days.astype(str)
+    columns['contribution_number'] = numbers.astype(str)
+    
+    ledger = {field: people[field][donor_rows] for field in PROSPECT_FIELDS}
+    ledger['category'] = np.array([c.name for c in profile.categories], dtype=object)[labels]
+    ledger['contribution_count'] = counts.astype(str)
+    ledger['total_cents'] = cents.sum(axis=1).astype(str)
+    ledger['last_date'] = days[starts + counts - 1].astype(str)
+    return columns, ledger
+
+def generate_campaign_columns(plan, chunk_size=DEFAULT_CHUNK_SIZE, seed=None):
+    """Yield (table, columns) chunks for a campaign plan of any size using NumPy.
+
+    Same rules and ordering as generate_campaign_stream(), but each chunk is
+    built column-at-a-time. Exact category, overlap and KYC counts are kept
+    by drawing each chunk's share from a (multivariate) hypergeometric
+    distribution over what is left.
+    """
+    rng = np.random.default_rng(seed)
+    profile = plan['profile']
+    sizes = plan['categories']
+    prospect_count = plan['prospects']
+    overlap = plan['overlap']
+    
+    allocator = plan['allocator']
+    categories_left = np.array([sizes[c.name] for c in profile.categories], dtype=np.int64)
+    min_counts = np.array([c.min_count for c in profile.categories], dtype=np.int64)
+    extra_states = {profile.categories.index(profile.by_name[name]): [extra, sizes[name]]
+                    for name, extra in plan['extras'].items()}
+    overlap_left, prospects_left = overlap, prospect_count
+    fail_left, non_donors_left = plan['kyc_fail'], prospect_count - overlap
+    
+    def contributions_for(people, donor_rows):
+        chunk_counts = rng.multivariate_hypergeometric(categories_left, len(donor_rows))
+        categories_left[:] -= chunk_counts
+        labels = np.repeat(np.arange(len(profile.categories)), chunk_counts)
+        rng.shuffle(labels)
+        counts = min_counts[labels]
+        for label, state in extra_states.items():
+            members = labels == label
+            counts[members] += np_even_shares(state, int(members.sum()), rng)
+        columns, ledger = np_contribution_columns(people, donor_rows, labels, counts, profile, rng)
+        yield 'donors', columns
+        yield 'ledger', ledger
+    
+    first_prospect = plan['prospect_start']
+    for start in range(first_prospect, first_prospect + prospect_count, chunk_size):
+        count = min(chunk_size, first_prospect + prospect_count - start)
+        people = np_people(allocator, start, count, rng)
+        yield 'prospects', people
+        
+        donor_count_here = rng.hypergeometric(overlap_left, prospects_left - overlap_left, count)
+        donates = np_random_mask(count, donor_count_here, rng)
+        overlap_left -= donor_count_here
+        prospects_left -= count
+        
+        non_donors = count - donor_count_here
+        fail_count = rng.hypergeometric(fail_left, non_donors_left - fail_left, non_donors) if non_donors else 0
+        fails = np.zeros(count, dtype=bool)
+        fails[np.flatnonzero(~donates)] = np_random_mask(non_donors, fail_count, rng)
+        fail_left -= fail_count
+        non_donors_left -= non_donors
+        yield 'kyc', {
+            'unique_id': people['unique_id'],
+            'first_name': people['first_name'],
+            'last_name': people['last_name'],
+            'kyc_status': np.where(fails, 'No', 'Yes')
+        }
+        
+        yield from contributions_for(people, np.flatnonzero(donates))
+    
+    first_new = plan['new_donor_start']
+    for start in range(first_new, first_new + plan['new_donors'], chunk_size):
+        count = min(chunk_size, first_new + plan['new_donors'] - start)
+        people = np_people(allocator, start, count, rng)
+        yield from contributions_for(people, np.arange(count))
+
+def save_csv(filename, data, fieldnames, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Save rows from a list or iterator in chunks; the extension picks CSV, .csv.gz, .csv.zst or .cols"""
+    with open_table_writer(filename, fieldnames, chunk_size) as writer:
+        for row in data:
+            writer.write(row)
+    return writer.rows
+
+TABLE_FIELDS = {'prospects': PROSPECT_FIELDS, 'donors': DONOR_FIELDS, 'kyc': KYC_FIELDS, 'ledger': LEDGER_FIELDS}
+
+def write_campaign(plan, paths, backend='python', chunk_size=DEFAULT_CHUNK_SIZE, seed=None, header=True):
+    """Generate one campaign plan into the given table paths and return rows written per table"""
+    random.seed(seed)
+    writers = {table: open_table_writer(path, TABLE_FIELDS[table], chunk_size, header=header)
+               for table, path in paths.items()}
+    try:
+        if backend == 'numpy':
+            for table, columns in generate_campaign_columns(plan, chunk_size, seed):
+                writers[table].write_columns(columns)
+        else:
+            for table, row in generate_campaign_stream(plan):
+                writers[table].write(row)
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return {table: writer.rows for table, writer in writers.items()}
+
+def save_campaign_meta(out_dir, profile, end_date, donors, contributions, appends=None):
+    """Write the campaign sidecar that append mode resumes from"""
+    meta = {
+        'profile': profile.spec,
+        'end_date': end_date,
+        'donors': donors,
+        'contributions': contributions,
+        'appends': appends or []
+    }
+    path = os.path.join(out_dir, CAMPAIGN_META)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+def write_campaign_shard(job):
+    """Process-pool entry point: (plan, paths, backend, chunk_size, seed, header) -> rows per table"""
+    return write_campaign(*job)
+
+def merge_shard_files(part_paths, path):
+    """Concatenate shard files in shard order; only the first part has a header.
+
+    Byte concatenation is valid for every format: gzip members, zstd frames
+    and columnar chunks all follow one another.
+    """
+    with open(path, 'wb') as out:
+        for part_path in part_paths:
+            with open(part_path, 'rb') as part:
+                shutil.copyfileobj(part, out, 1 << 20)
+            os.remove(part_path)
+
+def run_scale_mode(args):
+    """Stream a campaign of the requested size straight to disk, optionally across shards"""
+    print(f"Generating scaled campaign data into {args.out_dir}/ ...")
+    if args.profile:
+        print(f"  Using contribution profile {args.profile}")
+    os.makedirs(args.out_dir, exist_ok=True)
+    
+    paths = {table: table_path(args.out_dir, table, args.format) for table in TABLE_FIELDS}
+    profile = load_profile(args.profile)
+    plan = plan_campaign(args.prospects, args.donors, args.contributions, args.overlap, args.kyc_fail, profile)
+    shard_plans = split_plan(plan, args.shards)
+    # Per-shard seeds derive from the master seed, so output depends only on seed and shard count
+    shard_seeds = [random.getrandbits(64) for _ in shard_plans]
+    
+    if args.shards == 1:
+        rows = write_campaign(plan, paths, args.backend, args.chunk_size, shard_seeds[0])
+    else:
+        # Part names keep the table's extension so each shard writes the same format
+        part_paths = [{table: os.path.join(args.out_dir, f'.part-{shard:04d}-{os.path.basename(path)}')
+                       for table, path in paths.items()}
+                      for shard in range(args.shards)]
+        jobs = [(shard_plan, parts, args.backend, args.chunk_size, seed, shard == 0)
+                for shard, (shard_plan, parts, seed) in enumerate(zip(shard_plans, part_paths, shard_seeds))]
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            results = list(pool.map(write_campaign_shard, jobs))
+        rows = {table: sum(result[table] for result in results) for table in paths}
+        for table, path in paths.items():
+            merge_shard_files([parts[table] for parts in part_paths], path)
+        print(f"✓ Merged {args.shards} shards")
+    
+    end_date = date.fromordinal(profile.end_ordinal).isoformat()
+    save_campaign_meta(args.out_dir, profile, end_date, rows['ledger'], rows['donors'])
+    
+    print(f"✓ Generated {rows['prospects']} prospects")
+    print(f"✓ Generated {args.donors} unique donors with {rows['donors']} contributions")
+    print(f"✓ {args.overlap} donors overlap with prospects")
+    print(f"✓ Generated {rows['kyc']} KYC records ({args.kyc_fail} No)")
+    print("\n✓ All files saved successfully!")
+    for path in paths.values():
+        print(f"  - {path}")
+
+def run_append_mode(args):
+    """Append days of new contributions to an existing campaign.
+
+    Only the compact donor ledger is read: one pass counts donors in the
+    profile's fill category with headroom under its ceiling, a second picks
+    exactly --append-contributions of them by selection sampling, draws each
+    a gift that keeps them under the ceiling and rewrites the ledger. The
+    new rows are sorted by date and appended to the donors table, so the cost is
+    proportional to the donor count plus the new rows, never the history.
+    """
+    meta_path = os.path.join(args.out_dir, CAMPAIGN_META)
+    ledger_path = find_table(args.out_dir, 'ledger')
+    donors_path = find_table(args.out_dir, 'donors')
+    # Keep the extension so the rewritten ledger stays in the same format
+    ledger_tmp = os.path.join(args.out_dir, '.tmp-' + os.path.basename(ledger_path))
+    if not os.path.exists(meta_path) or not os.path.exists(ledger_path):
+        raise SystemExit(f"✗ No campaign ledger in {args.out_dir}/ - generate the campaign first")
+    
+    with open(meta_path) as f:
+        meta = json.load(f)
+    profile = ContributionProfile(meta['profile'])
+    category = profile.fill
+    ceiling = category.ceiling if category.ceiling is not None else FEC_LIMIT_CENTS
+    
+    def headroom(entry):
+        if entry['category'] != category.name:
+            return 0
+        room = ceiling - int(entry['total_cents'])
+        return room if room >= category.amount.min else 0
+    
+    eligible = sum(1 for entry in iter_rows(ledger_path) if headroom(entry))
+    if args.append_contributions > eligible:
+        raise SystemExit(f"✗ Only {eligible} '{category.name}' donors have headroom for "
+                         f"{args.append_contributions} new contributions")
+    
+    first_day = date.fromisoformat(meta['end_date']).toordinal() + 1
+    print(f"Appending {args.append_contributions} contributions over {args.append_days} days "
+          f"from {date.fromordinal(first_day)} ...")
+    
+    chosen = CategorySelector(eligible, {True: args.append_contributions})
+    contributions = []
+    with open_table_writer(ledger_tmp, LEDGER_FIELDS, args.chunk_size) as ledger:
+        for entry in iter_rows(ledger_path):
+            room = headroom(entry)
+            if room and chosen.draw():
+                cents = category.amount.draw(category.amount.min, room)
+                day = date.fromordinal(first_day + random.randrange(args.append_days)).isoformat()
+                number = int(entry['contribution_count']) + 1
+                contributions.append({
+                    **{field: entry[field] for field in PROSPECT_FIELDS},
+                    'contribution_amount': format_cents(cents),
+                    'contribution_date': day,
+                    'contribution_number': str(number)
+                })
+                entry['contribution_count'] = str(number)
+                entry['total_cents'] = str(int(entry['total_cents']) + cents)
+                entry['last_date'] = max(entry['last_date'], day)
+            ledger.write(entry)
+    
+    contributions.sort(key=lambda row: row['contribution_date'])
+    with open_table_writer(donors_path, DONOR_FIELDS, args.chunk_size, append=True) as writer:
+        for row in contributions:
+            writer.write(row)
+    os.replace(ledger_tmp, ledger_path)
+    
+    end_date = date.fromordinal(first_day + args.append_days - 1).isoformat()
+    appends = meta['appends'] + [{'days': args.append_days, 'contributions': len(contributions),
+                                  'end_date': end_date}]
+    save_campaign_meta(args.out_dir, profile, end_date, meta['donors'],
+                       meta['contributions'] + len(contributions), appends)
+    
+    print(f"✓ Appended {len(contributions)} contributions through {end_date}")
+    print(f"✓ Campaign now has {meta['contributions'] + len(contributions)} contributions "
+          f"from {meta['donors']} donors")
+    print(f"  - {donors_path}")
+    print(f"  - {ledger_path}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Generate clean campaign data tables')
+    parser.add_argument('--scale', action='store_true',
+                        help='Stream a campaign of arbitrary size to disk instead of the fixed 150/215 tables')
+    parser.add_argument('--prospects', type=int, default=150, help='Number of prospects (scale mode)')
+    parser.add_argument('--donors', type=int, default=150, help='Number of unique donors (scale mode)')
+    parser.add_argument('--contributions', type=int, default=215, help='Number of contributions (scale mode)')
+    parser.add_argument('--overlap', type=int, default=38, help='Donors who are also prospects (scale mode)')
+    parser.add_argument('--kyc-fail', type=int, default=11, help='Non-donor prospects failing KYC (scale mode)')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Rows buffered per write')
+    parser.add_argument('--format', choices=list(FORMATS), default='csv',
+                        help='Output format: plain, gzip or zstd CSV, or typed columnar (.cols)')
+    parser.add_argument('--out-dir', default='data', help='Output directory (scale mode)')
+    parser.add_argument('--backend', choices=['python', 'numpy'], default='python',
+                        help='Row-at-a-time Python generation or vectorised NumPy columns (scale mode)')
+    parser.add_argument('--profile',
+                        help='Contribution distribution profile (JSON/YAML, scale mode); defaults to the baseline mix')
+    parser.add_argument('--shards', type=int, default=1,
+                        help='Split generation into this many independently seeded shards (scale mode)')
+    parser.add_argument('--workers', type=int, help='Processes used for shards (default: CPU count)')
+    parser.add_argument('--seed', type=int, help='Random seed for reproducible output')
+    parser.add_argument('--append-days', type=int,
+                        help='Append this many days of contributions to the campaign in --out-dir')
+    parser.add_argument('--append-contributions', type=int,
+                        help='Number of contributions to append (with --append-days)')
+    args = parser.parse_args()
+    if (args.append_days is None) != (args.append_contributions is None):
+        parser.error('--append-days and --append-contributions must be given together')
+    if args.append_days is not None and (args.append_days < 1 or args.append_contributions < 0):
+        parser.error('--append-days must be at least 1 and --append-contributions non-negative')
+    if args.shards < 1:
+        parser.error('--shards must be at least 1')
+    if args.backend == 'numpy' and np is None:
+        parser.error('--backend numpy requires numpy (pip install numpy)')
+    return args
 
 def main():
+    args = parse_args()
+    if args.seed is not None:
+        random.seed(args.seed)
+    
+    if args.append_days is not None:
+        run_append_mode(args)
+        return
+    
+    if args.scale:
+        run_scale_mode(args)
+        return
+    
     print("Generating clean campaign data...")
     
     # Generate data
-    prospects = generate_prospects()
+    allocator = IdentityAllocator()
+    prospects = generate_prospects(allocator)
     print(f"✓ Generated {len(prospects)} unique prospects")
     
-    donors = generate_donors(prospects)
-    unique_donor_ids = list(set([d['unique_id'] for d in donors]))
+    categories = {}
+    donors = generate_donors(prospects, allocator, categories)
+    unique_donor_ids = set(d['unique_id'] for d in donors)
     print(f"✓ Generated {len(unique_donor_ids)} unique donors with {len(donors)} contributions")
     
     # Get donor IDs that are also prospects
-    prospect_ids = [p['unique_id'] for p in prospects]
-    overlap = [did for did in unique_donor_ids if did in prospect_ids]
+    prospect_ids = set(p['unique_id'] for p in prospects)
+    overlap = unique_donor_ids & prospect_ids
     print(f"✓ {len(overlap)} donors overlap with prospects")
     
     kyc = generate_kyc(prospects, unique_donor_ids)
@@ -419,23 +1179,17 @@ def main():
     no_count = sum(1 for k in kyc if k['kyc_status'] == 'No')
     print(f"✓ Generated KYC records: {yes_count} Yes, {no_count} No")
     
-    # Save to CSV files
-    save_csv('data/prospects.csv', prospects, 
-             ['unique_id', 'first_name', 'last_name', 'phone_number', 'employer', 
-              'occupation', 'address_line_1', 'address_line_2', 'city', 'state', 'zip', 'wallet_address'])
-    
-    save_csv('data/donors.csv', donors,
-             ['unique_id', 'first_name', 'last_name', 'phone_number', 'employer',
-              'occupation', 'address_line_1', 'address_line_2', 'city', 'state', 'zip', 
-              'wallet_address', 'contribution_amount', 'contribution_date', 'contribution_number'])
-    
-    save_csv('data/kyc.csv', kyc,
-             ['unique_id', 'first_name', 'last_name', 'kyc_status'])
+    # Save in the requested format
+    tables = {'prospects': prospects, 'donors': donors, 'kyc': kyc, 'ledger': build_ledger(donors, categories)}
+    paths = {table: table_path('data', table, args.format) for table in tables}
+    for table, rows in tables.items():
+        save_csv(paths[table], rows, TABLE_FIELDS[table])
+    save_campaign_meta('data', ContributionProfile(BASELINE_PROFILE), '2024-12-31',
+                       len(unique_donor_ids), len(donors))
     
     print("\n✓ All files saved successfully!")
-    print("  - data/prospects.csv")
-    print("  - data/donors.csv")
-    print("  - data/kyc.csv")
+    for path in paths.values():
+        print(f"  - {path}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Identity resolution: which unique_ids belong to the same person
+
+FEC limits apply per individual, but one person can give under several
+unique_ids. resolve_people() clusters donor records into people:
+
+1. Blocking: records are only compared with others that share a blocking
+   key: normalized last name + zip, phone digits, or lowercased wallet.
+   Comparisons then grow with block sizes, not n^2. A name block too big
+   to compare pairwise is split by street address. Nothing is lost by the
+   split, because a pair needs a shared identifier to match and the phone
+   and wallet blocks already pair records that share those.
+2. Scoring: name similarity (difflib ratio, averaged over given and last
+   name) raised by each identifier the pair shares (wallet, phone, street
+   address). A pair sharing no identifier never matches, however alike the
+   names are, and neither does one whose middle names or initials
+   disagree ("Ann K." vs "Ann B.").
+3. Merging: pairs scoring at least the threshold are joined with
+   union-find. Each person is named after the first-seen unique_id in its
+   cluster, so people with one ID keep it.
+"""
+
+import re
+from collections import Counter
+from difflib import SequenceMatcher
+
+IDENTITY_FIELDS = ['unique_id', 'first_name', 'last_name', 'phone_number', 'wallet_address',
+                   'address_line_1', 'zip']
+# Weight of each shared identifier: it closes this share of the gap between the name score and 1
+IDENTIFIER_WEIGHTS = {'wallet': 0.8, 'phone': 0.5, 'address': 0.3}
+MATCH_THRESHOLD = 0.95
+# Blocks with more records than this are split (names) or skipped (shared phones and wallets)
+MAX_BLOCK_SIZE = 50
+MIN_PHONE_DIGITS = 7
+
+class DisjointSet:
+    """Union-find over 0..n-1 with path halving and union by size"""
+
+    def __init__(self, size):
+        self.parent = list(range(size))
+        self.size = [1] * size
+
+    def find(self, i):
+        parent = self.parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(self, i, j):
+        """Join the sets of i and j; returns False if they were already joined"""
+        i, j = self.find(i), self.find(j)
+        if i == j:
+            return False
+        if self.size[i] < self.size[j]:
+            i, j = j, i
+        self.parent[j] = i
+        self.size[i] += self.size[j]
+        return True
+
+NON_ALPHANUMERIC = re.compile(r'[^a-z0-9]')
+NON_DIGIT = re.compile(r'\D')
+
+def normalize_text(value):
+    """Lowercase letters and digits only, so 'O'Brien ' and 'obrien' compare equal"""
+    return NON_ALPHANUMERIC.sub('', str(value).lower())
+
+def given_name(value):
+    return normalize_text(str(value).split(maxsplit=1)[0]) if str(value).strip() else ''
+
+def middle_names(value):
+    parts = str(value).split(maxsplit=1)
+    return normalize_text(parts[1]) if len(parts) > 1 else ''
+
+def normalize_zip(value):
+    digits = NON_DIGIT.sub('', str(value))[:5]
+    return digits.zfill(5) if digits else ''
+
+def normalize_phone(value):
+    digits = NON_DIGIT.sub('', str(value))
+    return digits if len(digits) >= MIN_PHONE_DIGITS else ''
+
+def normalize_wallet(value):
+    return str(value).lower()
+
+def normalized(values, normalize, repetitive=True):
+    """A column normalized with blanks and missing values (None, NaN) as ''.
+
+    Repetitive columns such as names and zips are normalized once per
+    distinct value.
+    """
+    if not repetitive:
+        return [normalize(v) if v and v == v else '' for v in values]
+    cache = {}
+    return [cache[v] if v in cache else cache.setdefault(v, normalize(v) if v and v == v else '')
+            for v in values]
+
+class People:
+    """Normalized identity columns of the first record of each unique_id"""
+
+    def __init__(self, columns):
+        first_rows = {}
+        for row, unique_id in enumerate(columns['unique_id']):
+            first_rows.setdefault(unique_id, row)
+        self.ids = list(first_rows)
+        rows = list(first_rows.values())
+
+        def column(field, normalize, repetitive=True):
+            values = columns.get(field)
+            if values is None:
+                return [''] * len(rows)
+            if len(rows) != len(columns['unique_id']):  # some IDs repeat: keep their first rows
+                values = [values[row] for row in rows]
+            return normalized(values, normalize, repetitive)
+
+        self.first = column('first_name', given_name)
+        self.middle = column('first_name', middle_names)
+        self.last = column('last_name', normalize_text)
+        self.zip = column('zip', normalize_zip)
+        self.phone = column('phone_number', normalize_phone, repetitive=False)
+        self.wallet = column('wallet_address', normalize_wallet, repetitive=False)
+        self.address = [street + zip_code if street and zip_code else ''
+                        for street, zip_code in zip(column('address_line_1', normalize_text), self.zip)]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def blocks(self):
+        """Lists of record indices to compare pairwise, one per repeated blocking key"""
+        name_keys = [last + zip_code if last and zip_code else '' for last, zip_code in zip(self.last, self.zip)]
+        for kind, keys in (('name', name_keys), ('phone', self.phone), ('wallet', self.wallet)):
+            repeated = {key for key, count in Counter(keys).items() if count > 1 and key}
+            grouped = {}
+            for i, key in enumerate(keys):
+                if key in repeated:
+                    grouped.setdefault(key, []).append(i)
+            for members in grouped.values():
+                if len(members) <= MAX_BLOCK_SIZE:
+                    yield members
+                elif kind == 'name':
+                    by_address = {}
+                    for i in members:
+                        if self.address[i]:
+                            by_address.setdefault(self.address[i], []).append(i)
+                    yield from (group for group in by_address.values() if 1 < len(group) <= MAX_BLOCK_SIZE)
+
+    def name_similarity(self, i, j):
+        first = SequenceMatcher(None, self.first[i], self.first[j]).ratio()
+        last = SequenceMatcher(None, self.last[i], self.last[j]).ratio()
+        return (first + last) / 2
+
+    def match_score(self, i, j):
+        """How likely records i and j are the same person, from 0 to 1"""
+        shared = [kind for kind in IDENTIFIER_WEIGHTS
+                  if getattr(self, kind)[i] and getattr(self, kind)[i] == getattr(self, kind)[j]]
+        if not shared or (self.middle[i] and self.middle[j] and self.middle[i] != self.middle[j]):
+            return 0.0
+        score = self.name_similarity(i, j)
+        for kind in shared:
+            score += IDENTIFIER_WEIGHTS[kind] * (1 - score)
+        return score
+
+def resolve_people(columns, threshold=MATCH_THRESHOLD):
+    """{unique_id: person_id} from {field: values} columns holding the IDENTITY_FIELDS.
+
+    Rows sharing a unique_id are one person; the first row's fields are
+    used for matching. Missing fields count as blank.
+    """
+    people = People(columns)
+    clusters = DisjointSet(len(people))
+    for members in people.blocks():
+        for n, i in enumerate(members):
+            for j in members[n + 1:]:
+                if clusters.find(i) != clusters.find(j) and people.match_score(i, j) >= threshold:
+                    clusters.union(i, j)
+
+    person_ids = {}
+    return {unique_id: person_ids.setdefault(clusters.find(i), unique_id) for i, unique_id in enumerate(people.ids)}
+
+def merged_people(resolved):
+    """{person_id: [unique_ids]} for the people found under more than one unique_id"""
+    people = {}
+    for unique_id, person_id in resolved.items():
+        if unique_id != person_id:
+            people.setdefault(person_id, [person_id]).append(unique_id)
+    return people
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Declarative rule sets for quality_control.py
+
+A rule set lists the campaign's expected counts and its per-row and
+per-key rules in a JSON file (or YAML when PyYAML is installed). It is
+compiled once: the rules on each table are grouped so one batch of
+columns is checked against all of them together, in the same pass that
+feeds the other QC checks. New rules need no code and no extra passes.
+
+A rule set file extends the built-in baseline (BASELINE_RULES): its
+expected counts are merged over the baseline's, so a metric it leaves
+out keeps the baseline's count and a metric set to null is not checked.
+Its rules are added to the baseline's; a rule with the name of a
+baseline rule replaces it, and {"name": ..., "disabled": true} drops it.
+"extends": null starts from an empty rule set instead, with no expected
+counts or rules but its own.
+
+Rule set format:
+
+    {
+      "name": "production",
+      "expect": {"prospects": 1200, "donors": 900, "contributions": null,
+                 "overlap": null, "kyc_yes": null, "kyc_no": null},
+      "rules": [
+        {"name": "kyc_values", "table": "kyc", "field": "kyc_status", "values": ["Yes", "No"]},
+        {"name": "required_fields", "table": "prospects", "required": ["first_name", "zip"]},
+        {"name": "id_format", "disabled": true}
+      ]
+    }
+
+- extends: "baseline" (the default) or null
+- expect: counts the run must produce, by metric name (see METRICS);
+  metrics left out keep the baseline's count (150 prospects and donors,
+  215 contributions, 38 overlapping, 139 KYC Yes and 11 KYC No), and
+  null stops checking a metric
+- table / tables: the tables a rule reads (prospects, donors, kyc)
+- pattern: the field must fully match this regular expression
+- values: the field must be one of these strings
+- required: none of these fields may be blank
+- max with per: the field, summed in cents per distinct `per` value, may
+  not exceed this dollar amount; with per_person the limit is also applied
+  to each person's total across the unique_ids identity resolution merges
+- description: report text saying what the rule requires
+"""
+
+import hashlib
+import json
+import re
+
+try:
+    import yaml
+except ImportError:  # YAML rule sets are optional
+    yaml = None
+
+# Tables quality_control.py reads
+TABLES = ('prospects', 'donors', 'kyc')
+# Expected-count metrics and their report labels
+METRICS = {
+    'prospects': 'Prospect count',
+    'donors': 'Unique donors',
+    'contributions': 'Total contributions',
+    'overlap': 'Prospect-donor overlap',
+    'kyc_yes': 'KYC Yes',
+    'kyc_no': 'KYC No',
+}
+
+BASELINE_RULES = {
+    'name': 'baseline',
+    'expect': {'prospects': 150, 'donors': 150, 'contributions': 215, 'overlap': 38, 'kyc_yes': 139, 'kyc_no': 11},
+    'rules': [
+        {'name': 'id_format', 'tables': ['prospects', 'donors', 'kyc'], 'field': 'unique_id',
+         'pattern': '[A-Z0-9]{8}', 'description': 'IDs are 8 alphanumeric characters'},
+        {'name': 'required_fields', 'table': 'prospects',
+         'required': ['first_name', 'last_name', 'phone_number', 'employer', 'occupation',
+                      'address_line_1', 'city', 'state', 'zip'],
+         'description': 'Required prospect fields are populated'},
+        {'name': 'fec_limit', 'table': 'donors', 'field': 'contribution_amount', 'per': 'unique_id',
+         'max': 3300.00, 'per_person': True,
+         'description': 'Donor totals stay within the $3,300 FEC limit'},
+    ],
+}
+
+def dollars_to_cents(value):
+    return round(float(value) * 100)
+
+def format_dollars(cents):
+    """'$3,300' for whole dollars, '$3,299.50' otherwise"""
+    text = f"${cents / 100:,.2f}"
+    return text[:-3] if text.endswith('.00') else text
+
+class Rule:
+    """One compiled rule over the rows of some tables"""
+
+    def __init__(self, spec):
+        self.name = spec['name']
+        tables = spec.get('tables', spec.get('table'))
+        self.tables = [tables] if isinstance(tables, str) else list(tables or [])
+        if not self.tables or not set(self.tables) <= set(TABLES):
+            raise ValueError(f"Rule '{self.name}' must name tables among {', '.join(TABLES)}")
+        self.description = spec.get('description', self.default_description(spec))
+
+    def default_description(self, spec):
+        return self.name
+
+    @property
+    def fields(self):
+        return []
+
+class RowRule(Rule):
+    """A rule each row passes or fails on its own"""
+
+    def failures(self, batch):
+        """(row index, offending value) for each failing row of a {field: values} batch"""
+        return []
+
+class PatternRule(RowRule):
+    """A field must fully match a regular expression"""
+
+    def __init__(self, spec):
+        self.field = spec['field']
+        self.pattern = re.compile(spec['pattern'])
+        super().__init__(spec)
+
+    def default_description(self, spec):
+        return f"{spec['field']} matches {spec['pattern']}"
+
+    @property
+    def fields(self):
+        return [self.field]
+
+    def failures(self, batch):
+        # Test each distinct value once; clean batches need no second scan
+        column = batch[self.field]
+        match = self.pattern.fullmatch
+        bad = {value for value in set(column) if not match(value)}
+        if not bad:
+            return []
+        return [(row, value) for row, value in enumerate(column) if value in bad]
+
+class ValuesRule(RowRule):
+    """A field must be one of a set of strings"""
+
+    def __init__(self, spec):
+        self.field = spec['field']
+        self.values = frozenset(spec['values'])
+        super().__init__(spec)
+
+    def default_description(self, spec):
+        return f"{spec['field']} is one of {', '.join(spec['values'])}"
+
+    @property
+    def fields(self):
+        return [self.field]
+
+    def failures(self, batch):
+        column = batch[self.field]
+        if set(column) <= self.values:
+            return []
+        return [(row, value) for row, value in enumerate(column) if value not in self.values]
+
+class RequiredRule(RowRule):
+    """None of some fields may be blank"""
+
+    def __init__(self, spec):
+        self.required = list(spec['required'])
+        super().__init__(spec)
+
+    def default_description(self, spec):
+        return f"{', '.join(spec['required'])} are populated"
+
+    @property
+    def fields(self):
+        return self.required
+
+    def failures(self, batch):
+        columns = [batch[field] for field in self.required]
+        if not any('' in column for column in columns):
+            return []
+        return [(row, [field for field, value in zip(self.required, values) if not value])
+                for row, values in enumerate(zip(*columns)) if not all(values)]
+
+class LimitRule(Rule):
+    """A field summed per key may not exceed a dollar amount"""
+
+    def __init__(self, spec):
+        self.field = spec['field']
+        self.per = spec['per']
+        self.max_cents = dollars_to_cents(spec['max'])
+        self.per_person = bool(spec.get('per_person'))
+        if self.per_person and self.per != 'unique_id':
+            raise ValueError(f"Rule '{spec['name']}' can only apply per person when summed per unique_id")
+        super().__init__(spec)
+
+    def default_description(self, spec):
+        return f"{spec['field']} per {spec['per']} stays within {format_dollars(dollars_to_cents(spec['max']))}"
+
+    @property
+    def fields(self):
+        return [self.per, self.field]
+
+    @property
+    def limit(self):
+        return format_dollars(self.max_cents)
+
+def compile_rule(spec):
+    for key, rule_type in (('pattern', PatternRule), ('values', ValuesRule), ('required', RequiredRule),
+                           ('max', LimitRule)):
+        if key in spec:
+            if rule_type is LimitRule and 'per' not in spec:
+                raise ValueError(f"Rule '{spec.get('name')}' needs 'per', the field to sum within")
+            try:
+                return rule_type(spec)
+            except KeyError as e:
+                raise ValueError(f"Rule '{spec.get('name')}' needs {e}") from None
+    raise ValueError(f"Rule '{spec.get('name')}' has no pattern, values, required or max setting")
+
+class RuleSet:
+    """A compiled rule set: expected counts, row rules grouped by table, and per-key limits"""
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.name = spec.get('name', 'custom')
+        self.expect = {metric: count for metric, count in spec.get('expect', {}).items() if count is not None}
+        unknown = set(self.expect) - set(METRICS)
+        if unknown:
+            raise ValueError(f"Unknown expected metrics: {', '.join(sorted(unknown))} "
+                             f"(expected some of {', '.join(METRICS)})")
+        self.rules = [compile_rule(rule) for rule in spec.get('rules', [])]
+        if len({rule.name for rule in self.rules}) != len(self.rules):
+            raise ValueError("Rule names must be unique")
+        self.limits = [rule for rule in self.rules if isinstance(rule, LimitRule)]
+        self.row_rules = {}
+        for rule in self.rules:
+            if isinstance(rule, RowRule):
+                for table in rule.tables:
+                    self.row_rules.setdefault(table, []).append(rule)
+        # Identifies the rule set in QC checkpoints, whose state depends on it
+        self.digest = hashlib.blake2b(json.dumps(spec, sort_keys=True).encode(), digest_size=16).hexdigest()
+
+    def tables(self):
+        return {table for rule in self.rules for table in rule.tables}
+
+    def fields(self, table):
+        """Fields the rules read from a table, plus unique_id to name failing rows"""
+        fields = ['unique_id']
+        for rule in self.rules:
+            if table in rule.tables:
+                fields.extend(f for f in rule.fields if f not in fields)
+        return fields if len(fields) > 1 else []
+
+    def evaluate(self, table, batch):
+        """(rule, failures) for every row rule on a table, from one batch of columns"""
+        return [(rule, rule.failures(batch)) for rule in self.row_rules.get(table, [])]
+
+def extend_rules(base, spec):
+    """A rule set spec merged over a base spec: expectations updated, rules replaced or dropped by name"""
+    expect = dict(base.get('expect', {}))
+    expect.update(spec.get('expect', {}))
+    rules = {rule['name']: rule for rule in base.get('rules', [])}
+    for rule in spec.get('rules', []):
+        if 'name' not in rule:
+            raise ValueError("Every rule needs a name")
+        if rule.get('disabled'):
+            if rule['name'] not in rules:
+                raise ValueError(f"Cannot disable rule '{rule['name']}': the {base['name']} rule set has no such rule")
+            del rules[rule['name']]
+        else:
+            rules[rule['name']] = rule
+    return {'name': spec.get('name', 'custom'), 'expect': expect, 'rules': list(rules.values())}
+
+def load_rules(path=None):
+    """Load and compile a rule set from a JSON/YAML file extending the baseline, or the baseline when path is None.
+
+    Raises ValueError for a file that does not parse or is not a valid rule set.
+    """
+    if path is None:
+        return RuleSet(BASELINE_RULES)
+    with open(path) as f:
+        if path.endswith(('.yaml', '.yml')):
+            if yaml is None:
+                raise ValueError("YAML rule sets require PyYAML (pip install pyyaml); use JSON instead")
+            try:
+                spec = yaml.safe_load(f)
+            except yaml.YAMLError as e:
+                raise ValueError(f"Cannot read {path}: {e}") from None
+        else:
+            try:
+                spec = json.load(f)
+            except ValueError as e:
+                raise ValueError(f"Cannot read {path}: {e}") from None
+    if not isinstance(spec, dict):
+        raise ValueError(f"Rule set {path} must be a mapping with 'expect' and 'rules'")
+    extends = spec.get('extends', 'baseline')
+    if extends is None:
+        return RuleSet(spec)
+    if extends != 'baseline':
+        raise ValueError(f"Rule set {path} extends '{extends}'; only 'baseline' or null are supported")
+    return RuleSet(extend_rules(BASELINE_RULES, spec))
@@ -5,71 +5,160 @@ Campaign Data Search and Export Tool
 Usage:
     python3 search-and-export.py                    # Interactive mode
     python3 search-and-export.py --search "term"    # Search for specific term
+    python3 search-and-export.py --filter "state=CA and contribution_amount>=1000"  # Query (see table_query.py)
     python3 search-and-export.py --export all       # Export everything
     python3 search-and-export.py --combine          # Combine all CSVs into one
+    python3 search-and-export.py --combine --format jsonl --gzip  # ...as gzipped JSON Lines
+    python3 search-and-export.py --no-cache --stats # Parse the CSVs, ignoring the cache
+
+Datasets are loaded only when a command first uses them. --export and
+--combine stream rows straight from the CSVs to the output in chunks, taking
+the output columns from the CSV headers, so they run in constant memory
+whatever the export size. Loaded tables
+and the search index are cached in exported-data/.explorer-cache and reused
+until a CSV changes (see explorer_cache.py).
 """
 
-import csv
 import json
 import os
 import sys
 import argparse
+from collections.abc import Mapping
 from pathlib import Path
 
+from campaign_table import CompactTable
+from explorer_cache import ExplorerCache
+from search_index import SearchIndex
+from table_io import column_type, iter_rows, open_table_writer, table_header
+from table_query import TableIndex, parse_query
+
+# Export formats and their file extensions; --gzip adds .gz to csv and jsonl
+OUTPUT_FORMATS = {'csv': '.csv', 'jsonl': '.jsonl', 'columnar': '.cols'}
+
+DATASET_FILES = {
+    'prospects': 'campaign_prospects.csv',
+    'donors': 'campaign_donors.csv',
+    'kyc': 'kyc.csv',
+    'validation': 'validation_summary.csv',
+    'merged': 'merged_donor_kyc_view.csv'
+}
+
+def export_types(fieldnames):
+    """Columnar types that keep every value's text as exported: dictionary blocks for repetitive fields"""
+    return ['dict' if column_type(field) in ('dict', 'date') else 'str' for field in fieldnames]
+
+class LazyTables(Mapping):
+    """{dataset: CompactTable} that loads each table, from the cache or its CSV, the first time it is used"""
+    
+    def __init__(self, data_dir, cache=None):
+        self.data_dir = data_dir
+        self.cache = cache
+        self.tables = {}
+    
+    def __getitem__(self, dataset):
+        if dataset not in DATASET_FILES:
+            raise KeyError(dataset)
+        if dataset not in self.tables:
+            self.tables[dataset] = self.load(dataset)
+        return self.tables[dataset]
+    
+    def __contains__(self, dataset):
+        return dataset in DATASET_FILES
+    
+    def __iter__(self):
+        return iter(DATASET_FILES)
+    
+    def __len__(self):
+        return len(DATASET_FILES)
+    
+    def load(self, dataset):
+        """Load one CSV file into memory as a compact table (rows read like DictReader dicts)"""
+        filename = DATASET_FILES[dataset]
+        filepath = self.data_dir / filename
+        if not filepath.exists():
+            if self.cache:
+                self.cache.missing_table(dataset)
+            print(f"⚠️  File not found: {filename}")
+            return CompactTable([])
+        table = self.cache.load_table(dataset, filepath) if self.cache else None
+        cached = table is not None
+        if not cached:
+            table = CompactTable.load(filepath)
+            if self.cache:
+                self.cache.save_table(dataset, filepath, table)
+        print(f"✅ Loaded {len(table)} records from {filename}{' (cached)' if cached else ''}")
+        return table
+    
+    def rows(self, dataset):
+        """Rows of a dataset for a single pass: the table's if it is loaded, else streamed from the CSV"""
+        if dataset in self.tables:
+            return iter(self.tables[dataset])
+        filepath = self.data_dir / DATASET_FILES[dataset]
+        if not filepath.exists():
+            print(f"⚠️  File not found: {DATASET_FILES[dataset]}")
+            return iter(())
+        return iter_rows(str(filepath))
+
 class CampaignDataExplorer:
-    def __init__(self):
+    def __init__(self, use_cache=True, output_format='csv', compress=False):
         self.data_dir = Path(__file__).parent / "exported-data"
-        self.data = {
-            'prospects': [],
-            'donors': [],
-            'kyc': [],
-            'validation': [],
-            'merged': []
-        }
-        self.load_all_data()
+        self.output_format = output_format
+        self.compress = compress
+        self.cache = ExplorerCache(self.data_dir) if use_cache else None
+        # Tables are loaded when a command first uses them
+        self.data = LazyTables(self.data_dir, self.cache)
+        self.index = None
+        # Per-dataset field indexes for filter queries, built as queries need them
+        self.query_indexes = {}
     
     def load_all_data(self):
-        """Load all CSV files into memory"""
-        files = {
-            'prospects': 'campaign_prospects.csv',
-            'donors': 'campaign_donors.csv',
-            'kyc': 'kyc.csv',
-            'validation': 'validation_summary.csv',
-            'merged': 'merged_donor_kyc_view.csv'
-        }
-        
-        for key, filename in files.items():
-            filepath = self.data_dir / filename
-            if filepath.exists():
-                with open(filepath, 'r') as f:
-                    reader = csv.DictReader(f)
-                    self.data[key] = list(reader)
-                print(f"✅ Loaded {len(self.data[key])} records from {filename}")
-            else:
-                print(f"⚠️  File not found: {filename}")
+        """Load every dataset now rather than on first use"""
+        for dataset in self.data:
+            self.data[dataset]
     
     def search(self, term, dataset='all'):
-        """Search across all data or specific dataset"""
+        """Search across all data or specific dataset (case-insensitive substring of any field)"""
         results = []
-        term_lower = term.lower()
         
         if dataset == 'all':
             datasets_to_search = self.data.keys()
         else:
             datasets_to_search = [dataset] if dataset in self.data else []
         
+        # The token/trigram index covers every dataset; it is built (or read from the cache) on the first search
+        if self.index is None:
+            self.load_all_data()
+            self.index = self.cache.load_index(self.data) if self.cache else None
+        if self.index is None:
+            print("🔎 Building search index...")
+            self.index = SearchIndex(self.data)
+            if self.cache:
+                self.cache.save_index(self.index)
+        matches = self.index.search(term, datasets_to_search)
+        
         for ds in datasets_to_search:
-            for record in self.data[ds]:
-                # Check if search term appears in any field
-                for field, value in record.items():
-                    if term_lower in str(value).lower():
-                        result = record.copy()
-                        result['_dataset'] = ds
-                        results.append(result)
-                        break
+            table = self.data[ds]
+            for row in matches.get(ds, []):
+                result = table.row(row).copy()
+                result['_dataset'] = ds
+                results.append(result)
         
         return results
     
+    def filter(self, expression):
+        """Records matching a query such as `state=CA and contribution_amount>=1000` (see table_query.py)"""
+        query = parse_query(expression)
+        results = []
+        for ds in self.data:
+            table = self.data[ds]
+            if ds not in self.query_indexes:
+                self.query_indexes[ds] = TableIndex(table)
+            for row in query.rows(self.query_indexes[ds]):
+                result = table.row(row).copy()
+                result['_dataset'] = ds
+                results.append(result)
+        return results
+    
     def display_results(self, results, limit=50):
         """Display search results in a formatted way"""
         if not results:
@@ -95,8 +184,19 @@ class CampaignDataExplorer:
                         value = value[:10] + '...' if len(value) > 10 else value
                     print(f"  {field}: {value}")
     
+    def output_path(self, stem):
+        """File name for an export in the chosen output format"""
+        return stem + OUTPUT_FORMATS[self.output_format] + ('.gz' if self.compress else '')
+    
+    def write_records(self, records, filename, fieldnames):
+        """Stream records into a file in chunks, in the format its extension names; returns the count"""
+        with open_table_writer(filename, fieldnames, types=export_types(fieldnames)) as writer:
+            for record in records:
+                writer.write(record)
+        return writer.rows
+    
     def export_results(self, results, filename='search_results.csv'):
-        """Export search results to CSV"""
+        """Export search results to CSV, JSON Lines or columnar, chosen by the file extension"""
         if not results:
             print("❌ No results to export")
             return
@@ -107,73 +207,68 @@ class CampaignDataExplorer:
             fieldnames.update(result.keys())
         fieldnames = sorted(list(fieldnames))
         
-        with open(filename, 'w', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(results)
-        
-        print(f"✅ Exported {len(results)} results to {filename}")
+        count = self.write_records(results, filename, fieldnames)
+        print(f"✅ Exported {count} results to {filename}")
+    
+    def export_dataset(self, dataset, filename):
+        """Export one dataset, streaming its rows unless its table is already loaded"""
+        filepath = self.data_dir / DATASET_FILES[dataset]
+        if not filepath.exists():
+            print(f"⚠️  File not found: {DATASET_FILES[dataset]}")
+            return
+        fieldnames = sorted(table_header(str(filepath)))
+        count = self.write_records(self.data.rows(dataset), filename, fieldnames)
+        print(f"✅ Exported {count} results to {filename}")
     
     def combine_all_data(self):
-        """Combine all datasets into a single CSV"""
-        all_records = []
+        """Combine all datasets into a single file, streaming each dataset's rows"""
+        sources = [ds for ds in self.data if (self.data_dir / DATASET_FILES[ds]).exists()]
         
-        # Add dataset identifier to each record
-        for dataset_name, records in self.data.items():
-            for record in records:
-                record_copy = record.copy()
-                record_copy['dataset_source'] = dataset_name
-                all_records.append(record_copy)
+        # The union of the field names comes from the CSV headers alone
+        fieldnames = {'dataset_source'}
+        for ds in sources:
+            fieldnames.update(table_header(str(self.data_dir / DATASET_FILES[ds])))
+        fieldnames = sorted(fieldnames)
         
-        # Get all unique field names
-        fieldnames = set()
-        for record in all_records:
-            fieldnames.update(record.keys())
-        fieldnames = sorted(list(fieldnames))
-        
-        # Write combined file
-        output_file = 'combined_all_data.csv'
-        with open(output_file, 'w', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(all_records)
+        def records():
+            for ds in sources:
+                for record in self.data.rows(ds):
+                    # Streamed rows are fresh dicts; rows of a loaded table are read-only views
+                    if not isinstance(record, dict):
+                        record = record.copy()
+                    record['dataset_source'] = ds
+                    yield record
         
-        print(f"✅ Combined {len(all_records)} records into {output_file}")
+        output_file = self.output_path('combined_all_data')
+        count = self.write_records(records(), output_file, fieldnames)
+        print(f"✅ Combined {count} records into {output_file}")
         return output_file
     
     def generate_statistics(self):
         """Generate and display statistics"""
+        donors, kyc, validation = self.data['donors'], self.data['kyc'], self.data['validation']
         stats = {
             'total_prospects': len(self.data['prospects']),
-            'total_donors': len(self.data['donors']),
-            'total_contributions': len(self.data['donors']),
-            'unique_donors': len(set(d['unique_id'] for d in self.data['donors'])),
-            'kyc_passed': sum(1 for k in self.data['kyc'] if k.get('kyc_passed') == '1'),
-            'kyc_failed': sum(1 for k in self.data['kyc'] if k.get('kyc_passed') == '0'),
+            'total_donors': len(donors),
+            'total_contributions': len(donors),
+            'unique_donors': len(donors.distinct('unique_id')),
+            'kyc_passed': kyc.count('kyc_passed', '1'),
+            'kyc_failed': kyc.count('kyc_passed', '0'),
         }
         
         # Calculate validation stats if available
-        if self.data['validation']:
-            stats['valid_contributions'] = sum(1 for v in self.data['validation'] 
-                                              if v.get('contract_decision') == 'ACCEPTED')
-            stats['invalid_contributions'] = sum(1 for v in self.data['validation'] 
-                                                if v.get('contract_decision') != 'ACCEPTED')
+        if validation:
+            stats['valid_contributions'] = validation.count('contract_decision', 'ACCEPTED')
+            stats['invalid_contributions'] = len(validation) - stats['valid_contributions']
             
-            # Calculate total amounts
-            total_amount = 0
-            valid_amount = 0
-            for v in self.data['validation']:
-                try:
-                    amount = float(v.get('contribution_amount', 0))
-                    total_amount += amount
-                    if v.get('contract_decision') == 'ACCEPTED':
-                        valid_amount += amount
-                except:
-                    pass
+            # Calculate total amounts in cents; unparseable amounts count as 0
+            amounts = validation.typed('contribution_amount', default=0)
+            total_amount = sum(amounts)
+            valid_amount = validation.group_sum('contract_decision', amounts).get('ACCEPTED', 0)
             
-            stats['total_amount_attempted'] = f"${total_amount:.2f}"
-            stats['total_amount_valid'] = f"${valid_amount:.2f}"
-            stats['success_rate'] = f"{(stats['valid_contributions'] / len(self.data['validation']) * 100):.1f}%"
+            stats['total_amount_attempted'] = f"${total_amount / 100:.2f}"
+            stats['total_amount_valid'] = f"${valid_amount / 100:.2f}"
+            stats['success_rate'] = f"{(stats['valid_contributions'] / len(validation) * 100):.1f}%"
         
         print("\n📊 CAMPAIGN DATA STATISTICS")
         print("=" * 50)
@@ -188,7 +283,7 @@ class CampaignDataExplorer:
     def interactive_mode(self):
         """Run interactive search mode"""
         print("\n🔍 INTERACTIVE SEARCH MODE")
-        print("Commands: search <term>, filter <field>=<value>, export, stats, combine, quit")
+        print("Commands: search <term>, filter <query>, export, stats, combine, quit")
         print("=" * 60)
         
         while True:
@@ -207,21 +302,15 @@ class CampaignDataExplorer:
                     self.display_results(results)
                     
                     if results and input("\nExport results? (y/n): ").lower() == 'y':
-                        filename = input("Filename (default: search_results.csv): ").strip()
+                        default = self.output_path('search_results')
+                        filename = input(f"Filename (default: {default}): ").strip()
                         if not filename:
-                            filename = 'search_results.csv'
+                            filename = default
                         self.export_results(results, filename)
                 
                 elif command.startswith('filter '):
-                    filter_expr = command[7:]
-                    if '=' in filter_expr:
-                        field, value = filter_expr.split('=', 1)
-                        results = []
-                        for dataset in self.data.values():
-                            for record in dataset:
-                                if record.get(field.strip()) == value.strip():
-                                    results.append(record)
-                        self.display_results(results)
+                    results = self.filter(command[7:])
+                    self.display_results(results)
                 
                 elif command == 'export':
                     self.combine_all_data()
@@ -230,7 +319,9 @@ class CampaignDataExplorer:
                     print("""
 Available commands:
   search <term>        - Search for a term across all data
-  filter <field>=<val> - Filter by specific field value
+  filter <query>       - Filter by field values, e.g. filter state=CA and contribution_amount>=1000
+                         (= != < <= > >=, between <low> and <high>, and, or, not, parentheses)
+                         quote values holding parentheses or operators: employer="A (B)"
   stats               - Show statistics
   combine             - Combine all CSVs into one file
   export              - Export current results
@@ -248,28 +339,40 @@ Available commands:
 def main():
     parser = argparse.ArgumentParser(description='Campaign Data Search and Export Tool')
     parser.add_argument('--search', help='Search for a specific term')
+    parser.add_argument('--filter', help='Records matching a query, e.g. "state=CA and contribution_amount>=1000"')
     parser.add_argument('--export', choices=['all', 'prospects', 'donors', 'kyc', 'validation'], 
                        help='Export specific dataset')
     parser.add_argument('--combine', action='store_true', help='Combine all CSVs into one')
     parser.add_argument('--stats', action='store_true', help='Display statistics')
+    parser.add_argument('--format', choices=list(OUTPUT_FORMATS), default='csv',
+                        help='Output format for exports: CSV, JSON Lines or columnar binary (default: csv)')
+    parser.add_argument('--gzip', action='store_true', help='Gzip CSV and JSON Lines output')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Parse the CSVs and build the search index without reading or writing the cache')
     
     args = parser.parse_args()
+    if args.gzip and args.format == 'columnar':
+        parser.error("--gzip applies to csv and jsonl output; columnar output is compressed already")
     
-    explorer = CampaignDataExplorer()
+    explorer = CampaignDataExplorer(use_cache=not args.no_cache, output_format=args.format, compress=args.gzip)
     
     if args.search:
         results = explorer.search(args.search)
         explorer.display_results(results)
         if results:
-            explorer.export_results(results, f"search_{args.search.replace(' ', '_')}.csv")
+            explorer.export_results(results, explorer.output_path(f"search_{args.search.replace(' ', '_')}"))
+    
+    elif args.filter:
+        results = explorer.filter(args.filter)
+        explorer.display_results(results)
+        if results:
+            explorer.export_results(results, explorer.output_path('filter_results'))
     
     elif args.export:
         if args.export == 'all':
             explorer.combine_all_data()
         else:
-            data = explorer.data.get(args.export, [])
-            if data:
-                explorer.export_results(data, f"{args.export}_export.csv")
+            explorer.export_dataset(args.export, explorer.output_path(f"{args.export}_export"))
     
     elif args.combine:
         explorer.combine_all_data()
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Inverted index for case-insensitive substring search over CompactTables
+
+SearchIndex finds the rows with a field containing some text without
+scanning the tables. It is built once from the loaded tables, in layers:
+
+- values: each column's distinct values (an encoded column's dictionary,
+  the distinct numbers of a typed column, or every value of a packed
+  column), with the rows holding each
+- tokens: the lowercased runs of letters and digits in those values,
+  shared by all tables, each with the values it occurs in
+- trigrams: the three-character slices of every token, each with the
+  tokens it occurs in
+
+A term without spaces or punctuation can only occur inside a single token.
+The postings of its trigrams are intersected to find candidate tokens, a
+substring test confirms them, and the rows of those tokens' values are the
+result. A phrase is looked up by its longest word, and the candidate values
+are confirmed against the whole phrase. A one- or two-character term is
+found through the trigrams that contain it.
+
+Postings are flat int32 arrays with start offsets (NumPy arrays when NumPy
+is installed, which also builds the trigram layer in vectorized chunks).
+An index pickles without the texts it shares with its tables; attach()
+reconnects an unpickled index to the same tables.
+"""
+
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate, chain
+
+from campaign_table import EncodedColumn, PackedColumn, TEXT_FORMATS
+from table_io import column_type
+
+try:
+    import numpy as np
+except ImportError:  # the pure Python paths give the same results, only slower
+    np = None
+
+TOKEN = re.compile(r'[^\W_]+')
+GRAM = 3
+# Code point bits per character of a trigram code
+GRAM_BITS = 21
+# Tokens turned into trigrams per NumPy chunk
+GRAM_CHUNK = 1 << 16
+# Longest token prefix turned into trigrams as a character matrix; the rest of a longer token is sliced in Python
+MATRIX_WIDTH = 64
+
+def gram_code(gram):
+    a, b, c = map(ord, gram)
+    return (a << 2 * GRAM_BITS) | (b << GRAM_BITS) | c
+
+def grams(text):
+    return {text[i:i + GRAM] for i in range(len(text) - GRAM + 1)}
+
+class Postings:
+    """Sorted int ids per key 0..size-1, stored as one flat int32 array plus start offsets"""
+
+    def __init__(self, starts, ids):
+        self.starts = starts
+        self.ids = ids
+
+    @classmethod
+    def group(cls, keys, ids, size):
+        """Postings of ids listed in ascending order with their keys; ids=None means each key's position"""
+        if np is not None:
+            keys = np.frombuffer(keys, dtype=np.int32) if isinstance(keys, array) else keys
+            order = np.argsort(keys, kind='stable')
+            if ids is None:
+                ids = order.astype(np.int32)
+            else:
+                ids = (np.frombuffer(ids, dtype=np.int32) if isinstance(ids, array) else ids)[order]
+            starts = np.zeros(size + 1, dtype=np.int64)
+            np.cumsum(np.bincount(keys, minlength=size), out=starts[1:])
+            return cls(starts, ids)
+        buckets = [[] for _ in range(size)]
+        for key, id in zip(keys, range(len(keys)) if ids is None else ids):
+            buckets[key].append(id)
+        return cls(array('q', accumulate(map(len, buckets), initial=0)), array('i', chain.from_iterable(buckets)))
+
+    def __len__(self):
+        return len(self.starts) - 1
+
+    def __getitem__(self, key):
+        return self.ids[self.starts[key]:self.starts[key + 1]]
+
+    def union(self, keys):
+        """Sorted distinct ids posted under any of the keys"""
+        if np is not None:
+            parts = [self[key] for key in keys]
+            return np.unique(np.concatenate(parts)) if parts else np.zeros(0, dtype=np.int32)
+        return sorted(set(chain.from_iterable(self[key] for key in keys)))
+
+def intersect(postings):
+    """Sorted ids present in every one of some sorted id arrays, smallest first"""
+    postings = sorted(postings, key=len)
+    if np is not None:
+        result = np.unique(postings[0])
+        for ids in postings[1:]:
+            if not len(result):
+                break
+            result = result[np.isin(result, ids, assume_unique=False)]
+        return result
+    result = set(postings[0])
+    for ids in postings[1:]:
+        result.intersection_update(ids)
+    return sorted(result)
+
+def np_token_grams(tokens):
+    """(trigram codes, token positions) for every trigram of some tokens, ordered by position"""
+    lengths = np.fromiter(map(len, tokens), dtype=np.int64, count=len(tokens))
+    width = min(int(lengths.max(initial=0)), MATRIX_WIDTH)
+    if width < GRAM:
+        return np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.int32)
+    chars = np.array([token[:width] for token in tokens], dtype=f'U{width}')
+    chars = chars.view(np.uint32).reshape(len(tokens), width).astype(np.uint64)
+    codes = (chars[:, :-2] << np.uint64(2 * GRAM_BITS)) | (chars[:, 1:-1] << np.uint64(GRAM_BITS)) | chars[:, 2:]
+    present = np.arange(width - GRAM + 1) < (np.minimum(lengths, width) - GRAM + 1)[:, None]
+    codes, ids = codes[present], np.nonzero(present)[0].astype(np.int32)
+    long = np.flatnonzero(lengths > width)
+    if len(long):
+        # Trigrams starting past the matrix, in Python; then restore position order
+        extra = [(gram_code(tokens[i][j:j + GRAM]), i) for i in long.tolist()
+                 for j in range(width - GRAM + 1, len(tokens[i]) - GRAM + 1)]
+        codes = np.concatenate((codes, np.array([code for code, _ in extra], dtype=np.uint64)))
+        ids = np.concatenate((ids, np.array([i for _, i in extra], dtype=np.int32)))
+        order = np.argsort(ids, kind='stable')
+        codes, ids = codes[order], ids[order]
+    return codes, ids
+
+class ColumnValues:
+    """The distinct values of one table column, numbered from `base` in the index's value space"""
+
+    def __init__(self, dataset, table, field, base):
+        self.dataset = dataset
+        self.field = field
+        self.base = base
+        column = table.columns[field]
+        # Encoded and packed columns' texts are the table's own, so they are not pickled with the index
+        self.shared = isinstance(column, (EncodedColumn, PackedColumn))
+        if self.shared:
+            self.attach(table)
+            codes = column.codes if isinstance(column, EncodedColumn) else None  # packed: each row its own value
+        else:
+            distinct = {}
+            codes = array('i', [distinct.setdefault(value, len(distinct)) for value in column])
+            self.texts = list(map(TEXT_FORMATS[column_type(field)], distinct))
+        self.rows = Postings.group(codes, None, len(self.texts)) if codes is not None else None
+
+    def attach(self, table):
+        """Read the texts of shared columns from the table the index was built over"""
+        column = table.columns[self.field]
+        self.texts = column.interner.values if isinstance(column, EncodedColumn) else column
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        if self.shared:
+            del state['texts']
+        return state
+
+    def __len__(self):
+        return len(self.texts)
+
+    def text(self, value):
+        return self.texts[value - self.base]
+
+    def value_rows(self, values):
+        """Rows holding any of some sorted index value ids of this column"""
+        if np is not None:
+            values = np.asarray(values, dtype=np.int64) - self.base
+            if self.rows is None:
+                return values
+            return np.concatenate([self.rows[value] for value in values.tolist()])
+        if self.rows is None:
+            return [value - self.base for value in values]
+        return list(chain.from_iterable(self.rows[value - self.base] for value in values))
+
+class SearchIndex:
+    """Token and trigram index over some named CompactTables; see the module docstring"""
+
+    def __init__(self, tables):
+        self.columns = []
+        base = 0
+        for dataset, table in tables.items():
+            for field in table.fields:
+                column = ColumnValues(dataset, table, field, base)
+                self.columns.append(column)
+                base += len(column)
+        self.bases = [column.base for column in self.columns]
+
+        tokens = {}
+        token_keys, token_values = array('i'), array('i')
+        for column in self.columns:
+            for value, text in enumerate(column.texts, column.base):
+                for token in dict.fromkeys(TOKEN.findall(text.lower())):
+                    token_keys.append(tokens.setdefault(token, len(tokens)))
+                    token_values.append(value)
+        self.token_values = Postings.group(token_keys, token_values, len(tokens))
+        del token_keys, token_values
+        token_list = list(tokens)
+        del tokens
+        # Token texts for confirming trigram candidates, packed instead of one str each
+        self.tokens = PackedColumn()
+        self.tokens.extend(token_list)
+        self.short_tokens = [i for i, token in enumerate(token_list) if len(token) < GRAM]
+        self.build_grams(token_list)
+
+    def build_grams(self, tokens):
+        """Trigram codes, sorted, and the tokens posted under each"""
+        if np is None:
+            postings = {}
+            for i, token in enumerate(tokens):
+                for gram in grams(token):
+                    postings.setdefault(gram_code(gram), []).append(i)
+            self.gram_codes = array('Q', sorted(postings))
+            lists = [postings[code] for code in self.gram_codes]
+            self.gram_tokens = Postings(array('q', accumulate(map(len, lists), initial=0)),
+                                        array('i', chain.from_iterable(lists)))
+            return
+        codes, ids = [], []
+        for start in range(0, len(tokens), GRAM_CHUNK):
+            chunk_codes, chunk_ids = np_token_grams(tokens[start:start + GRAM_CHUNK])
+            codes.append(chunk_codes)
+            ids.append(chunk_ids + np.int32(start))
+        codes = np.concatenate(codes) if codes else np.zeros(0, dtype=np.uint64)
+        ids = np.concatenate(ids) if ids else np.zeros(0, dtype=np.int32)
+        order = np.argsort(codes, kind='stable')
+        codes = codes[order]
+        ids = ids[order]
+        del order
+        firsts = np.flatnonzero(np.diff(codes)) + 1 if len(codes) else np.zeros(0, dtype=np.int64)
+        self.gram_codes = codes[np.concatenate(([0], firsts))] if len(codes) else codes
+        self.gram_tokens = Postings(np.concatenate(([0], firsts, [len(codes)])).astype(np.int64), ids)
+
+    def gram_key(self, gram):
+        """Position of a trigram in gram_codes, or -1 if no token contains it"""
+        code = gram_code(gram)
+        if np is not None:
+            key = int(np.searchsorted(self.gram_codes, np.uint64(code)))
+        else:
+            key = bisect_right(self.gram_codes, code) - 1
+        return key if 0 <= key < len(self.gram_codes) and self.gram_codes[key] == code else -1
+
+    def tokens_containing(self, piece):
+        """Ids of the tokens that contain a lowercase word or word fragment"""
+        if len(piece) < GRAM:
+            # Every longer token containing the piece has a trigram containing it
+            if np is not None:
+                chars = [np.uint64(ord(c)) for c in piece]
+                codes = self.gram_codes
+                parts = [(codes >> np.uint64((GRAM - 1 - i) * GRAM_BITS)) & np.uint64((1 << GRAM_BITS) - 1)
+                         for i in range(GRAM)]
+                hits = np.zeros(len(codes), dtype=bool)
+                for offset in range(GRAM - len(piece) + 1):
+                    hit = np.ones(len(codes), dtype=bool)
+                    for i, char in enumerate(chars):
+                        hit &= parts[offset + i] == char
+                    hits |= hit
+                keys = np.nonzero(hits)[0]
+            else:
+                keys = [key for key, code in enumerate(self.gram_codes)
+                        if piece in ''.join(chr((code >> (GRAM - 1 - i) * GRAM_BITS) & ((1 << GRAM_BITS) - 1))
+                                            for i in range(GRAM))]
+            candidates = self.gram_tokens.union(keys)
+            return sorted(set(candidates).union(i for i in self.short_tokens if piece in self.tokens[i]))
+        keys = [self.gram_key(gram) for gram in grams(piece)]
+        if -1 in keys:
+            return []
+        candidates = intersect([self.gram_tokens[key] for key in keys])
+        if len(piece) == GRAM:
+            return candidates
+        return [i for i in candidates if piece in self.tokens[i]]
+
+    def attach(self, tables):
+        """Reconnect an unpickled index to the same {dataset: CompactTable} it was built over"""
+        for column in self.columns:
+            if column.shared:
+                column.attach(tables[column.dataset])
+
+    def column_of(self, value):
+        return self.columns[bisect_right(self.bases, value) - 1]
+
+    def search(self, term, datasets=None):
+        """{dataset: sorted rows} whose fields contain `term`, case-insensitively, like `term in value.lower()`"""
+        term = term.lower()
+        pieces = TOKEN.findall(term)
+        columns = [column for column in self.columns if datasets is None or column.dataset in datasets]
+        if not pieces:
+            # Only spaces or punctuation: test every value
+            values = [value for column in columns for value, text in enumerate(column.texts, column.base)
+                      if term in text.lower()]
+        else:
+            piece = max(pieces, key=len)
+            values = self.token_values.union(self.tokens_containing(piece))
+            if pieces != [term]:
+                values = [value for value in values if term in self.column_of(value).text(value).lower()]
+        # Values are sorted, so each column's are one contiguous run
+        find = np.searchsorted if np is not None else bisect_left
+        rows = {}
+        for column in columns:
+            run = values[find(values, column.base):find(values, column.base + len(column))]
+            if len(run):
+                rows.setdefault(column.dataset, []).append(column.value_rows(run))
+        if np is not None:
+            return {dataset: np.unique(np.concatenate(parts)).tolist() for dataset, parts in rows.items()}
+        return {dataset: sorted(set(chain.from_iterable(parts))) for dataset, parts in rows.items()}
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Fixed-memory sketches for checking very large campaign tables
+
+- hash_values() gives deterministic 64-bit hashes of strings (FNV-1a with a
+  splitmix64 finaliser). They are identical with and without NumPy and in
+  every process, unlike hash(), so sketches built by worker processes merge.
+- SeenTwiceFilter is a counting Bloom filter whose counters stop at 2. It
+  answers "seen at least twice?" with no false negatives, so re-reading the
+  data and exactly counting only the flagged values finds every duplicate
+  while holding just the true duplicates and a few false positives.
+- HyperLogLog estimates distinct counts from 2**precision one-byte
+  registers, with a standard error of 1.04 / sqrt(2**precision).
+
+Both sketches merge by combining their arrays, so byte-range chunks of a
+table can be sketched in parallel. Arrays are allocated on first use, so
+empty sketches are cheap to pickle.
+"""
+
+import math
+
+try:
+    import numpy as np
+except ImportError:  # the pure Python paths give the same results, only slower
+    np = None
+
+MASK64 = (1 << 64) - 1
+FNV_OFFSET = 0xcbf29ce484222325
+FNV_PRIME = 0x100000001b3
+MIX_1 = 0xbf58476d1ce4e5b9
+MIX_2 = 0x94d049bb133111eb
+FILTER_HASHES = 4
+HLL_PRECISION = 14
+
+def mix64(z):
+    """splitmix64 finaliser, spreading FNV's weak low bits across the word"""
+    z ^= z >> 30
+    z = (z * MIX_1) & MASK64
+    z ^= z >> 27
+    z = (z * MIX_2) & MASK64
+    return z ^ (z >> 31)
+
+def hash_bytes(data):
+    h = FNV_OFFSET
+    for byte in data:
+        h = ((h ^ byte) * FNV_PRIME) & MASK64
+    return mix64(h ^ len(data))
+
+def np_mix64(z):
+    z ^= z >> np.uint64(30)
+    z *= np.uint64(MIX_1)
+    z ^= z >> np.uint64(27)
+    z *= np.uint64(MIX_2)
+    return z ^ (z >> np.uint64(31))
+
+def np_hash_values(values):
+    """hash_bytes() of every string, computed a byte column at a time over a padded matrix"""
+    encoded = [value.encode() for value in values]
+    lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+    width = int(lengths.max(initial=0))
+    hashes = np.full(len(encoded), FNV_OFFSET, dtype=np.uint64)
+    if width:
+        matrix = np.array(encoded, dtype=f'S{width}').view(np.uint8).reshape(len(encoded), width)
+        for column in range(width):
+            stepped = (hashes ^ matrix[:, column]) * np.uint64(FNV_PRIME)
+            hashes = np.where(lengths > column, stepped, hashes)
+    return np_mix64(hashes ^ lengths.astype(np.uint64))
+
+def hash_values(values):
+    """Deterministic 64-bit hashes of strings: a uint64 array with NumPy, else a list of ints"""
+    if np is not None:
+        return np_hash_values(values)
+    return [hash_bytes(value.encode()) for value in values]
+
+def np_bit_length(words):
+    """int.bit_length() of every uint64, by binary search over shifts"""
+    lengths = np.zeros(len(words), dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        big = words >= (np.uint64(1) << np.uint64(shift))
+        lengths += big * shift
+        words = np.where(big, words >> np.uint64(shift), words)
+    return lengths + (words > 0)
+
+class SeenTwiceFilter:
+    """Counting Bloom filter with counters that saturate at 2, one byte per counter"""
+
+    def __init__(self, size, hashes=FILTER_HASHES):
+        self.size = size
+        self.hashes = hashes
+        self.counters = None
+
+    def allocate(self):
+        if self.counters is None:
+            self.counters = np.zeros(self.size, dtype=np.uint8) if np is not None else bytearray(self.size)
+
+    def positions(self, hashes):
+        """Counter positions of each hash by double hashing: (low + i * high) mod size"""
+        if np is not None:
+            low = hashes & np.uint64(0xffffffff)
+            high = (hashes >> np.uint64(32)) | np.uint64(1)
+            steps = np.arange(self.hashes, dtype=np.uint64)
+            return ((low[:, None] + steps * high[:, None]) % np.uint64(self.size)).astype(np.int64)
+        return [[((h & 0xffffffff) + i * ((h >> 32) | 1)) % self.size for i in range(self.hashes)]
+                for h in hashes]
+
+    def add(self, hashes):
+        self.allocate()
+        positions = self.positions(hashes)
+        if np is not None:
+            touched, counts = np.unique(positions, return_counts=True)
+            self.counters[touched] = np.minimum(self.counters[touched] + counts, 2)
+            return
+        counters = self.counters
+        for row in positions:
+            for position in row:
+                if counters[position] < 2:
+                    counters[position] += 1
+
+    def query(self, hashes, times):
+        """Whether each hash may have been added at least `times` (1 or 2) times"""
+        self.allocate()
+        positions = self.positions(hashes)
+        if np is not None:
+            return (self.counters[positions] >= times).all(axis=1).tolist()
+        return [all(self.counters[p] >= times for p in row) for row in positions]
+
+    def seen(self, hashes):
+        return self.query(hashes, 1)
+
+    def seen_twice(self, hashes):
+        return self.query(hashes, 2)
+
+    def saturation(self):
+        """Share of counters at 2; a unique value is flagged with probability about this ** hashes"""
+        if self.counters is None:
+            return 0.0
+        if np is not None:
+            return float(np.count_nonzero(self.counters == 2)) / self.size
+        return self.counters.count(2) / self.size
+
+    def merge(self, other):
+        if other.counters is None:
+            return
+        self.allocate()
+        if np is not None:
+            self.counters = np.minimum(self.counters + other.counters, 2).astype(np.uint8)
+        else:
+            self.counters = bytearray(min(a + b, 2) for a, b in zip(self.counters, other.counters))
+
+class HyperLogLog:
+    """HyperLogLog distinct-count estimator over 64-bit hashes"""
+
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.registers = None
+
+    def allocate(self):
+        if self.registers is None:
+            size = 1 << self.precision
+            self.registers = np.zeros(size, dtype=np.uint8) if np is not None else bytearray(size)
+
+    def add(self, hashes):
+        self.allocate()
+        p = self.precision
+        if np is not None:
+            index = (hashes >> np.uint64(64 - p)).astype(np.int64)
+            rest = hashes << np.uint64(p)
+            ranks = np.minimum(64 - np_bit_length(rest) + 1, 64 - p + 1).astype(np.uint8)
+            np.maximum.at(self.registers, index, ranks)
+            return
+        registers = self.registers
+        for h in hashes:
+            index = h >> (64 - p)
+            rank = min(64 - ((h << p) & MASK64).bit_length() + 1, 64 - p + 1)
+            if rank > registers[index]:
+                registers[index] = rank
+
+    def merge(self, other):
+        if other.registers is None:
+            return
+        self.allocate()
+        if np is not None:
+            self.registers = np.maximum(self.registers, other.registers)
+        else:
+            self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def estimate(self):
+        """Estimated number of distinct values added"""
+        if self.registers is None:
+            return 0
+        m = 1 << self.precision
+        alpha = 0.7213 / (1 + 1.079 / m)
+        registers = self.registers.tolist() if np is not None else self.registers
+        estimate = alpha * m * m / sum(2.0 ** -r for r in registers)
+        zeros = registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
+
+    def standard_error(self):
+        return 1.04 / math.sqrt(1 << self.precision)
@@ -0,0 +1,576 @@
+#!/usr/bin/env python3
+"""
+Campaign table storage formats
+
+Tables can be written and read as plain CSV, streaming gzip/zstd CSV, or a
+typed columnar binary format, chosen by file extension:
+
+    donors.csv       plain CSV
+    donors.csv.gz    gzip CSV
+    donors.csv.zst   zstd CSV (requires zstandard)
+    donors.cols      columnar
+
+Exports can also be written as JSON Lines (.jsonl, .jsonl.gz, .jsonl.zst),
+one object of strings per row; those files are not read back.
+
+Columnar layout (all integers little-endian):
+
+    b'CAMPCOL1', uint32 schema length, schema JSON {"fields": [...], "types": [...]}
+    then chunks of: uint32 row count, and per column: uint32 length + zlib block
+
+Column blocks by type, before compression:
+- cents: int64 amounts in cents
+- date:  int32 date ordinals (0 for empty)
+- int:   int64
+- dict:  uint32 dictionary length, NUL-joined dictionary, uint32 codes
+- str:   NUL-joined UTF-8 values
+
+A column may also be stored as dict or str blocks whatever its field's
+usual type (exports do this to keep amounts' text exactly); readers then
+return its values as text.
+
+Chunks are self-contained, so shard parts and appended batches are
+concatenated as-is (only the first part carries the header), exactly as
+gzip members and zstd frames are. Readers can skip the blocks of columns
+they do not ask for without decompressing them.
+
+split_table() cuts plain CSV and columnar tables into byte ranges (on line
+and chunk boundaries) that iter_batches() reads independently, so a table
+can be processed in parallel, or only its appended tail re-read.
+Compressed CSV is only entered at member/frame boundaries.
+"""
+
+import csv
+import gzip
+import io
+import json
+import os
+import re
+import struct
+import sys
+import zlib
+from array import array
+from bisect import bisect_left
+from datetime import date
+from functools import lru_cache
+from itertools import islice
+
+try:
+    import zstandard
+except ImportError:  # only needed for .csv.zst tables
+    zstandard = None
+
+DEFAULT_CHUNK_SIZE = 10000
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+# Level 1 keeps most of the size win while decompressing fast
+COLUMNAR_ZLIB_LEVEL = 1
+# Bytes of plain CSV decoded at a time when reading a byte range
+CSV_BLOCK_SIZE = 1 << 23
+# split_table() makes no range smaller than this
+MIN_RANGE_BYTES = 1 << 22
+
+FORMATS = {'csv': '.csv', 'csv.gz': '.csv.gz', 'csv.zst': '.csv.zst', 'columnar': '.cols'}
+JSONL_EXTENSIONS = ('.jsonl', '.jsonl.gz', '.jsonl.zst')
+COLUMNAR_MAGIC = b'CAMPCOL1'
+COLUMN_TYPES = {
+    'contribution_amount': 'cents',
+    'contribution_date': 'date',
+    'last_date': 'date',
+    'contribution_number': 'int',
+    'contribution_count': 'int',
+    'total_cents': 'int',
+    'city': 'dict',
+    'state': 'dict',
+    'zip': 'dict',
+    'employer': 'dict',
+    'occupation': 'dict',
+    'kyc_status': 'dict',
+    'category': 'dict',
+}
+ARRAY_CODES = {'cents': 'q', 'date': 'i', 'int': 'q'}
+# Newline-terminated amounts exactly as format_cents() writes them
+CANONICAL_CENTS = re.compile(r'(?:-?(?:0|[1-9][0-9]*)\.[0-9]{2}\n)*')
+# Arrays are stored little-endian whatever the host byte order
+SWAP_BYTES = sys.byteorder == 'big'
+
+def table_path(data_dir, name, fmt='csv'):
+    """Path of a table in the given format"""
+    return os.path.join(data_dir, name + FORMATS[fmt])
+
+def find_table(data_dir, name):
+    """Path of the most recently written copy of a table in any supported format.
+
+    Falls back to the plain CSV path when no copy exists, so callers get the
+    usual file-not-found error for it.
+    """
+    paths = [os.path.join(data_dir, name + extension) for extension in FORMATS.values()]
+    existing = [path for path in paths if os.path.exists(path)]
+    return max(existing, key=os.path.getmtime) if existing else paths[0]
+
+def is_columnar(path):
+    return path.endswith(FORMATS['columnar'])
+
+def is_jsonl(path):
+    return path.endswith(JSONL_EXTENSIONS)
+
+def open_text(path, mode='r'):
+    """Open a plain, gzip or zstd CSV file as text; mode is 'r', 'w' or 'a'"""
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', compresslevel=GZIP_LEVEL, newline='')
+    if path.endswith('.zst'):
+        if zstandard is None:
+            raise ValueError(f"Reading or writing {path} requires zstandard (pip install zstandard)")
+        raw = open(path, mode + 'b')
+        if mode == 'r':
+            stream = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True)
+        else:
+            stream = zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(raw)
+        return io.TextIOWrapper(stream, newline='')
+    return open(path, mode, newline='')
+
+def column_type(field):
+    return COLUMN_TYPES.get(field, 'str')
+
+def parse_cents(value):
+    """Integer cents from a dollar string (or an int already in cents)"""
+    return value if isinstance(value, int) else round(float(value) * 100)
+
+def format_cents(cents):
+    sign = '-' if cents < 0 else ''
+    dollars, remainder = divmod(abs(cents), 100)
+    return f'{sign}{dollars}.{remainder:02d}'
+
+@lru_cache(maxsize=None)
+def date_ordinal(value):
+    """Date ordinal from a YYYY-MM-DD string (or an ordinal already), 0 for an empty date"""
+    if isinstance(value, int):
+        return value
+    return date.fromisoformat(value).toordinal() if value else 0
+
+@lru_cache(maxsize=None)
+def ordinal_date(ordinal):
+    return date.fromordinal(ordinal).isoformat() if ordinal else ''
+
+def canonical_cents(values):
+    """Cents for a batch of amount strings all in format_cents() form, or None if any is not.
+
+    Checked with one regex over the whole batch, so such text is known to
+    round-trip without formatting every value back.
+    """
+    text = '\n'.join(values) + '\n'
+    if not values or not CANONICAL_CENTS.fullmatch(text):
+        return None
+    return array('q', map(int, text.replace('.', '').split()))
+
+def typed_column(kind, values):
+    """Typed form of a column: int arrays for numeric types, lists of str otherwise"""
+    if kind == 'cents':
+        return array('q', map(parse_cents, values))
+    if kind == 'date':
+        return array('i', map(date_ordinal, values))
+    if kind == 'int':
+        return array('q', map(int, values))
+    return list(values)
+
+def array_bytes(values):
+    if SWAP_BYTES:
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+def unpack_array(code, payload):
+    values = array(code)
+    values.frombytes(payload)
+    if SWAP_BYTES:
+        values.byteswap()
+    return values
+
+def join_strings(values):
+    blob = '\x00'.join(values).encode()
+    if blob.count(0) != len(values) - 1:
+        raise ValueError("Columnar string values cannot contain NUL characters")
+    return blob
+
+def encode_column(kind, values):
+    """Encode one chunk of a column into its binary block"""
+    if kind in ARRAY_CODES:
+        return array_bytes(typed_column(kind, values))
+    if kind == 'dict':
+        index = {}
+        codes = array_bytes(array('I', [index.setdefault(value, len(index)) for value in values]))
+        words = join_strings(list(index))
+        return struct.pack('<I', len(words)) + words + codes
+    return join_strings(values)
+
+def decode_column(kind, block):
+    """Decode a binary block: arrays of ints for numeric types, lists of str otherwise"""
+    if kind in ARRAY_CODES:
+        return unpack_array(ARRAY_CODES[kind], block)
+    if kind == 'dict':
+        (length,) = struct.unpack_from('<I', block)
+        words = block[4:4 + length].decode().split('\x00')
+        return list(map(words.__getitem__, unpack_array('I', block[4 + length:])))
+    return block.decode().split('\x00')
+
+def column_text(kind, values):
+    """String form of a decoded column, as it would appear in CSV"""
+    if not isinstance(values, array):  # stored as text already
+        return values
+    if kind == 'cents':
+        return list(map(format_cents, values))
+    if kind == 'date':
+        return list(map(ordinal_date, values))
+    if kind == 'int':
+        return list(map(str, values))
+    return values
+
+class ChunkedCsvWriter:
+    """CSV writer that buffers rows and flushes them to disk in fixed-size chunks"""
+
+    def __init__(self, filename, fieldnames, chunk_size=DEFAULT_CHUNK_SIZE, append=False, header=True):
+        self.file = open_text(filename, 'a' if append else 'w')
+        self.writer = csv.DictWriter(self.file, fieldnames=fieldnames)
+        if header and not append:
+            self.writer.writeheader()
+        self.chunk_size = chunk_size
+        self.buffer = []
+        self.rows = 0
+
+    def write(self, row):
+        self.buffer.append(row)
+        if len(self.buffer) >= self.chunk_size:
+            self.flush()
+
+    def write_columns(self, columns):
+        """Write a chunk given as equal-length string columns keyed by field name.
+
+        Generated values never contain delimiters, quotes or newlines, so the
+        lines are joined directly rather than going through csv quoting.
+        """
+        self.flush()
+        values = [columns[field] for field in self.writer.fieldnames]
+        values = [v.tolist() if hasattr(v, 'tolist') else v for v in values]
+        if values[0]:
+            self.file.write('\r\n'.join(map(','.join, zip(*values))) + '\r\n')
+        self.rows += len(values[0])
+
+    def flush(self):
+        self.writer.writerows(self.buffer)
+        self.rows += len(self.buffer)
+        self.buffer = []
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class JsonLinesWriter(ChunkedCsvWriter):
+    """JSON Lines writer with the same interface as ChunkedCsvWriter: one object per row, missing fields blank"""
+
+    def __init__(self, filename, fieldnames, chunk_size=DEFAULT_CHUNK_SIZE, append=False, header=True):
+        self.file = open_text(filename, 'a' if append else 'w')
+        self.fieldnames = list(fieldnames)
+        self.chunk_size = chunk_size
+        self.buffer = []
+        self.rows = 0
+
+    def write_columns(self, columns):
+        self.flush()
+        values = [columns[field] for field in self.fieldnames]
+        values = [v.tolist() if hasattr(v, 'tolist') else v for v in values]
+        self.write_lines(dict(zip(self.fieldnames, row)) for row in zip(*values))
+
+    def flush(self):
+        self.write_lines({field: row.get(field, '') for field in self.fieldnames} for row in self.buffer)
+        self.buffer = []
+
+    def write_lines(self, objects):
+        lines = [json.dumps(obj, ensure_ascii=False) + '\n' for obj in objects]
+        self.file.write(''.join(lines))
+        self.rows += len(lines)
+
+class ColumnarWriter(ChunkedCsvWriter):
+    """Columnar writer with the same interface as ChunkedCsvWriter; each flush writes one chunk.
+
+    `types` overrides the stored type of each field, e.g. 'str' for an
+    amount column that may hold blanks; rows missing a field store ''.
+    """
+
+    def __init__(self, filename, fieldnames, chunk_size=DEFAULT_CHUNK_SIZE, append=False, header=True, types=None):
+        self.file = open(filename, 'ab' if append else 'wb')
+        self.fieldnames = list(fieldnames)
+        self.types = list(types) if types is not None else [column_type(field) for field in self.fieldnames]
+        if header and not append:
+            schema = json.dumps({'fields': self.fieldnames, 'types': self.types}).encode()
+            self.file.write(COLUMNAR_MAGIC + struct.pack('<I', len(schema)) + schema)
+        self.chunk_size = chunk_size
+        self.buffer = []
+        self.rows = 0
+
+    def write_columns(self, columns):
+        self.flush()
+        values = [columns[field] for field in self.fieldnames]
+        self.write_chunk([v.tolist() if hasattr(v, 'tolist') else v for v in values])
+
+    def flush(self):
+        if self.buffer:
+            self.write_chunk([[row.get(field, '') for row in self.buffer] for field in self.fieldnames])
+            self.buffer = []
+
+    def write_chunk(self, values):
+        count = len(values[0])
+        if not count:
+            return
+        parts = [struct.pack('<I', count)]
+        for kind, column in zip(self.types, values):
+            block = zlib.compress(encode_column(kind, column), COLUMNAR_ZLIB_LEVEL)
+            parts.append(struct.pack('<I', len(block)))
+            parts.append(block)
+        self.file.write(b''.join(parts))
+        self.rows += count
+
+def open_table_writer(filename, fieldnames, chunk_size=DEFAULT_CHUNK_SIZE, append=False, header=True,
+                      types=None):
+    """Chunked writer for a table, in the format given by the file extension.
+
+    `types` sets the stored column types of columnar output (see ColumnarWriter).
+    """
+    if is_columnar(filename):
+        return ColumnarWriter(filename, fieldnames, chunk_size, append, header, types)
+    writer = JsonLinesWriter if is_jsonl(filename) else ChunkedCsvWriter
+    return writer(filename, fieldnames, chunk_size, append, header)
+
+def read_columnar_schema(f):
+    """Read and check the columnar header, returning (fields, types)"""
+    if f.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+        raise ValueError(f"{f.name} is not a columnar campaign table")
+    (length,) = struct.unpack('<I', f.read(4))
+    schema = json.loads(f.read(length))
+    return schema['fields'], schema['types']
+
+def columnar_types(path):
+    """{field: stored type} of a columnar table, which ColumnarWriter's `types` may set apart from column_type()"""
+    with open(path, 'rb') as f:
+        return dict(zip(*read_columnar_schema(f)))
+
+def table_header(path):
+    """Field names of a table in any supported format"""
+    if is_columnar(path):
+        with open(path, 'rb') as f:
+            return read_columnar_schema(f)[0]
+    with open_text(path) as f:
+        return next(csv.reader(f), [])
+
+def iter_column_chunks(path, fields=None, byte_range=None):
+    """Yield each chunk of a columnar table as {field: typed column}, optionally only some fields.
+
+    `byte_range` is a (start, end) pair from split_table(); only the chunks
+    starting inside it are read.
+    """
+    with open(path, 'rb') as f:
+        all_fields, types = read_columnar_schema(f)
+        wanted = set(all_fields if fields is None else fields)
+        if byte_range is not None:
+            f.seek(byte_range[0])
+        while True:
+            if byte_range is not None and f.tell() >= byte_range[1]:
+                return
+            head = f.read(4)
+            if not head:
+                return
+            chunk = {}
+            for field, kind in zip(all_fields, types):
+                (length,) = struct.unpack('<I', f.read(4))
+                if field in wanted:
+                    chunk[field] = decode_column(kind, zlib.decompress(f.read(length)))
+                else:
+                    f.seek(length, os.SEEK_CUR)
+            yield chunk
+
+def iter_rows(path, fields=None):
+    """Yield rows of any supported table format as dicts of strings, like csv.DictReader.
+
+    With `fields`, rows hold only those fields; columnar tables then skip
+    decoding the other columns entirely. Blank CSV lines are skipped, and
+    fields missing from short rows are empty strings, as in iter_batches().
+    """
+    if not is_columnar(path):
+        with open_text(path) as f:
+            if fields is None:
+                yield from csv.DictReader(f)
+                return
+            reader = csv.reader(f)
+            header = next(reader)
+            positions = [header.index(field) for field in fields]
+            width = max(positions, default=-1) + 1
+            for row in filter(None, reader):
+                if len(row) < width:
+                    row += [''] * (width - len(row))
+                yield dict(zip(fields, [row[i] for i in positions]))
+        return
+    types = columnar_types(path)
+    for chunk in iter_column_chunks(path, fields):
+        names = list(chunk)
+        columns = [column_text(types[name], chunk[name]) for name in names]
+        for values in zip(*columns):
+            yield dict(zip(names, values))
+
+def columnar_chunk_offsets(path):
+    """Byte offsets of every chunk of a columnar table, followed by the end of the file"""
+    offsets = []
+    with open(path, 'rb') as f:
+        fields, types = read_columnar_schema(f)
+        while True:
+            offsets.append(f.tell())
+            if not f.read(4):
+                return offsets
+            for _ in fields:
+                (length,) = struct.unpack('<I', f.read(4))
+                f.seek(length, os.SEEK_CUR)
+
+def split_table(path, parts, min_bytes=MIN_RANGE_BYTES, start=None):
+    """Split a table's rows into at most `parts` (start, end) byte ranges for iter_batches().
+
+    Plain CSV is cut just after a newline (generated values never contain
+    one) and columnar tables on chunk boundaries. `start` skips the rows
+    before a byte offset where an earlier read ended. Compressed CSV cannot
+    be entered mid-stream, so it is never split and `start` must be a gzip
+    member or zstd frame boundary, as appends create. A whole table that is
+    not split comes back as [None].
+    """
+    end = os.path.getsize(path)
+    if path.endswith(('.gz', '.zst')):
+        if start is None:
+            return [None]
+        return [(start, end)] if start < end else []
+    if is_columnar(path):
+        offsets = columnar_chunk_offsets(path)
+        first = offsets[0]
+    else:
+        with open(path, 'rb') as f:
+            f.readline()
+            first = f.tell()
+    whole = start is None
+    start = first if whole else start
+    parts = min(parts, (end - start) // min_bytes)
+    if parts <= 1:
+        if whole:
+            return [None]
+        return [(start, end)] if start < end else []
+
+    cuts = [start]
+    with open(path, 'rb') as f:
+        for k in range(1, parts):
+            target = start + (end - start) * k // parts
+            if is_columnar(path):
+                cut = offsets[bisect_left(offsets, target)]
+            else:
+                f.seek(target - 1)
+                f.readline()
+                cut = f.tell()
+            if cuts[-1] < cut < end:
+                cuts.append(cut)
+    return list(zip(cuts, cuts[1:] + [end]))
+
+def iter_csv_range(path, start, end, block_size=CSV_BLOCK_SIZE):
+    """Yield parsed CSV rows from bytes [start, end) of a plain CSV file; both must be line boundaries"""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            data = f.read(min(block_size, remaining))
+            if len(data) < remaining:
+                data += f.readline()
+            if not data:
+                return
+            remaining -= len(data)
+            # Blank lines parse as empty rows; csv.DictReader skips them, and so do we
+            yield from filter(None, csv.reader(io.StringIO(data.decode('utf-8'), newline='')))
+
+def iter_compressed_range(path, start, end):
+    """Yield parsed CSV rows from bytes [start, end) of a gzip or zstd CSV made of whole members or frames"""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = io.BytesIO(f.read(end - start))
+    if path.endswith('.gz'):
+        stream = gzip.GzipFile(fileobj=data)
+    else:
+        stream = zstandard.ZstdDecompressor().stream_reader(data, read_across_frames=True)
+    with io.TextIOWrapper(stream, newline='') as text:
+        yield from filter(None, csv.reader(text))
+
+def iter_batches(path, fields, batch_size=DEFAULT_CHUNK_SIZE, byte_range=None):
+    """Yield a table in batches of string columns, {field: values}, reading only `fields`.
+
+    Cheaper than row dicts when a consumer walks a few columns; blank CSV
+    lines are skipped, as csv.DictReader does, and short rows are padded
+    with empty strings. `byte_range` restricts reading to
+    one range from split_table().
+    """
+    if is_columnar(path):
+        types = columnar_types(path)
+        for chunk in iter_column_chunks(path, fields, byte_range):
+            yield {field: column_text(types[field], chunk[field]) for field in fields}
+        return
+    with open_text(path) as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        positions = [header.index(field) for field in fields]
+        if byte_range is not None and path.endswith(('.gz', '.zst')):
+            reader = iter_compressed_range(path, *byte_range)
+        elif byte_range is not None:
+            reader = iter_csv_range(path, *byte_range)
+        reader = filter(None, reader)
+        width = max(positions, default=-1) + 1
+        while True:
+            rows = list(islice(reader, batch_size))
+            if not rows:
+                return
+            try:
+                yield {field: [row[i] for row in rows] for field, i in zip(fields, positions)}
+            except IndexError:
+                rows = [row if len(row) >= width else row + [''] * (width - len(row)) for row in rows]
+                yield {field: [row[i] for row in rows] for field, i in zip(fields, positions)}
+
+def load_columns(path, fields=None):
+    """Load a whole columnar table as {field: typed column}; read CSV with iter_batches() instead"""
+    if not is_columnar(path):
+        raise ValueError(f"{path} is not a columnar table")
+    columns = {}
+    for chunk in iter_column_chunks(path, fields):
+        for field, values in chunk.items():
+            if field in columns:
+                columns[field].extend(values)
+            else:
+                columns[field] = values
+    return columns
+
+def load_frame(path):
+    """Load a table as a pandas DataFrame; amounts come back in dollars and dates as strings, as with read_csv.
+
+    Columnar columns are decoded by their stored types, so a column stored
+    as text comes back as strings.
+    """
+    import pandas as pd
+
+    if not is_columnar(path):
+        return pd.read_csv(path)
+    types = columnar_types(path)
+    frame = {}
+    for field, values in load_columns(path).items():
+        kind = types[field]
+        if kind == 'cents':
+            frame[field] = pd.Series(values, dtype='int64') / 100
+        elif kind == 'date':
+            frame[field] = column_text(kind, values)
+        elif kind == 'int':
+            frame[field] = pd.Series(values, dtype='int64')
+        else:
+            frame[field] = values
+    return pd.DataFrame(frame)
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Joins between campaign tables that need not fit in memory
+
+join_rows() joins two streams of row dicts on a key column. It starts as
+an in-memory hash join, building a table of the right-hand (lookup) rows.
+If those rows outgrow the memory budget, it becomes an external sort-merge
+join. Both sides are cut into sorted runs of about the budget, which are
+spilled to temporary files. The runs are merged back with heapq.merge and
+matched key by key, so only one run block per file and one key's rows are
+in memory at a time.
+
+A hash join yields matches in left-row order. A sort-merge join yields
+them in key order, with rows of the same key in their original order.
+"""
+
+import heapq
+import pickle
+import tempfile
+from itertools import chain, groupby
+from operator import itemgetter
+
+DEFAULT_MEMORY_MB = 256
+# Rough bytes a row dict takes beyond the characters of its values
+ROW_OVERHEAD = 200
+# Records per pickled block of a spill file
+SPILL_BLOCK = 10000
+
+def row_bytes(row):
+    return ROW_OVERHEAD + sum(len(str(value)) for value in row.values())
+
+class SpillRun:
+    """A sorted run of (key, seq, row) records, pickled in blocks to a temporary file"""
+
+    def __init__(self, records, directory=None):
+        self.file = tempfile.TemporaryFile(dir=directory)
+        for start in range(0, len(records), SPILL_BLOCK):
+            pickle.dump(records[start:start + SPILL_BLOCK], self.file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def __iter__(self):
+        self.file.seek(0)
+        while True:
+            try:
+                block = pickle.load(self.file)
+            except EOFError:
+                self.file.close()
+                return
+            yield from block
+
+def external_sort(records, budget, directory=None):
+    """(key, seq, row) records sorted by key and seq, spilling sorted runs of about `budget` bytes"""
+    runs, chunk, size = [], [], 0
+    order = itemgetter(0, 1)
+    for record in records:
+        chunk.append(record)
+        size += row_bytes(record[2])
+        if size >= budget:
+            chunk.sort(key=order)
+            runs.append(SpillRun(chunk, directory))
+            chunk, size = [], 0
+    chunk.sort(key=order)
+    if not runs:
+        return iter(chunk)
+    return heapq.merge(*runs, iter(chunk), key=order)
+
+def key_groups(records):
+    """(key, [rows]) for sorted (key, seq, row) records"""
+    for key, group in groupby(records, key=itemgetter(0)):
+        yield key, [row for _, _, row in group]
+
+def merge_join(left, right, how):
+    """Join two sorted (key, seq, row) streams"""
+    right_groups = key_groups(right)
+    right_key, right_rows = next(right_groups, (None, []))
+    for key, left_rows in key_groups(left):
+        while right_key is not None and right_key < key:
+            right_key, right_rows = next(right_groups, (None, []))
+        matches = right_rows if right_key == key else []
+        for left_row in left_rows:
+            for right_row in matches:
+                yield left_row, right_row
+            if not matches and how == 'left':
+                yield left_row, None
+
+def join_rows(left, right, key='unique_id', how='inner', memory_mb=DEFAULT_MEMORY_MB, spill_dir=None):
+    """Join two iterables of row dicts on `key`, yielding (left row, right row) pairs.
+
+    `how` is 'inner', or 'left' to also yield (left row, None) for left
+    rows with no match. Put the smaller table on the right: it is the one
+    held in memory when it fits in `memory_mb`.
+    """
+    if how not in ('inner', 'left'):
+        raise ValueError(f"Unsupported join type: {how}")
+    budget = int(memory_mb * (1 << 20))
+    right = iter(right)
+    table, size = {}, 0
+    for row in right:
+        table.setdefault(row[key], []).append(row)
+        size += row_bytes(row)
+        if size > budget:
+            break
+    else:
+        for left_row in left:
+            matches = table.get(left_row[key])
+            if matches:
+                for right_row in matches:
+                    yield left_row, right_row
+            elif how == 'left':
+                yield left_row, None
+        return
+
+    # Too big to hash: sort both sides out of core. Rows already read keep their per-key order.
+    held = (row for rows in table.values() for row in rows)
+    right_records = ((row[key], seq, row) for seq, row in enumerate(chain(held, right)))
+    right_sorted = external_sort(right_records, budget, spill_dir)
+    table = None
+    left_sorted = external_sort(((row[key], seq, row) for seq, row in enumerate(left)), budget, spill_dir)
+    yield from merge_join(left_sorted, right_sorted, how)
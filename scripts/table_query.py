@@ -0,0 +1,546 @@
+#!/usr/bin/env python3
+"""
+Structured queries over CompactTables
+
+parse_query() compiles a filter expression such as
+
+    contribution_amount>=1000 and state=CA and contribution_date between 2024-03-01 and 2024-06-30
+
+into a tree of predicates. Query.rows() answers the tree from per-field
+indexes instead of testing every row.
+
+Syntax:
+
+- comparisons: field = != < <= > >= value, and field between low and high
+- and, or, not and parentheses; `and` binds tighter than `or`
+- a value is either quoted ('...' or "...") or bare text. Bare text runs
+  on up to an and/or that starts another comparison, so
+  `employer=Smith and Sons and state=CA` compares employer with
+  "Smith and Sons", and apostrophes inside it (last_name=O'Brien) are
+  plain text. Quote a value that contains parentheses or an operator, or
+  one that ends in words looking like a comparison (`employer="A or b=c"`)
+- an empty value matches blank cells: `contribution_amount=`
+
+Amounts, dates and counts compare as numbers or dates, so
+contribution_amount>=1000 means $1,000.00 or more. Other fields compare
+as exact text for = and !=. For ranges they compare as numbers when the
+bound is a number (cumulative_total>3300) and as text otherwise. A field a
+table does not have matches none of its rows, and blank amounts, counts
+and dates fall outside every range.
+
+Indexes are built the first time a query needs them and kept in the
+TableIndex for later queries:
+
+- dictionary-encoded columns: a hash index, the rows of each distinct
+  value, plus the distinct values in sorted order. Text equality is one
+  lookup and a range two binary searches over the distinct values; the
+  matching values' rows are then merged.
+- typed numeric columns: a sorted index, the row order that sorts the
+  column, so a range takes two binary searches
+- packed, mostly distinct columns: a hash index of their values for text
+  equality, and a scan otherwise
+
+An `and` runs its most selective child (by exact index counts) through its
+index, then tests the other children only against those candidate rows.
+"""
+
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import chain
+
+from campaign_table import EncodedColumn, PackedColumn
+from search_index import Postings
+from table_io import column_type, date_ordinal, parse_cents
+
+try:
+    import numpy as np
+except ImportError:  # the pure Python paths give the same results, only slower
+    np = None
+
+# Words may hold quotes and a '!' not followed by '='; a quote only opens a string where a token starts
+TOKENS = re.compile(r'''\s*(?:("[^"]*"|'[^']*')|(<=|>=|!=|=|<|>)|([()])|((?:[^\s()<>=!]|!(?!=))+))''')
+KEYWORDS = {'and', 'or', 'not', 'between'}
+OPERATORS = {'=', '!=', '<', '<=', '>', '>=', 'between'}
+# A key below every amount and count, for blank cells of those columns; blank dates are day 0
+BLANK_KEY = float('-inf')
+
+def cents_key(text):
+    return parse_cents(text) if text != '' else BLANK_KEY
+
+def int_key(text):
+    return int(text) if text != '' else BLANK_KEY
+
+# Parsers from query text to the keys typed columns are stored as
+TYPED_KEYS = {'cents': cents_key, 'date': date_ordinal, 'int': int_key}
+BLANK_KEYS = {'cents': BLANK_KEY, 'date': 0, 'int': BLANK_KEY}
+
+def tokenize(text):
+    """(kind, text, (start, end)) tokens, kind being 'value' (quoted), 'op', 'paren' or 'word'"""
+    tokens, pos = [], 0
+    while pos < len(text):
+        match = TOKENS.match(text, pos)
+        if not match:
+            raise ValueError(f"Cannot read {text[pos:].strip()!r}")
+        quoted, op, paren, word = match.groups()
+        if quoted is not None:
+            tokens.append(('value', quoted[1:-1], match.span(1)))
+        elif op:
+            tokens.append(('op', op, match.span(2)))
+        elif paren:
+            tokens.append(('paren', paren, match.span(3)))
+        else:
+            tokens.append(('word', word, match.span(4)))
+        pos = match.end()
+    return tokens
+
+def union(parts):
+    """Sorted distinct rows of some row lists"""
+    if np is not None:
+        return np.unique(np.concatenate(parts)) if parts else np.zeros(0, dtype=np.int64)
+    return sorted(set(chain.from_iterable(parts)))
+
+def difference(rows, removed):
+    """Sorted rows without some others"""
+    if np is not None:
+        return np.setdiff1d(rows, removed, assume_unique=True)
+    removed = set(removed)
+    return [row for row in rows if row not in removed]
+
+class Bound:
+    """The keys a comparison accepts, for one field's type"""
+
+    def __init__(self, field, op, values):
+        kind = column_type(field)
+        if op not in ('=', '!=') and '' in values:
+            raise ValueError(f"Expected a value to compare {field} with")
+        # Typed columns hold keys already; text cells are converted with parse() first
+        if kind in TYPED_KEYS:
+            convert = TYPED_KEYS[kind]
+        elif op not in ('=', '!=') and all(is_number(value) for value in values):
+            convert = float
+        else:
+            convert = str
+        try:
+            keys = [convert(value) for value in values]
+        except ValueError:
+            raise ValueError(f"{field} compares as {'a date' if kind == 'date' else 'a number'}: "
+                             f"cannot read {' and '.join(map(repr, values))}") from None
+        self.convert = convert
+        self.exact = convert is str and op in ('=', '!=')
+        self.negate = op == '!='
+        self.low = self.high = None
+        self.include_low = self.include_high = True
+        if op in ('=', '!=', '>=', '>', 'between'):
+            self.low, self.include_low = keys[0], op != '>'
+        if op in ('=', '!=', '<=', '<'):
+            self.high, self.include_high = keys[0], op != '<'
+        elif op == 'between':
+            self.high = keys[1]
+        if kind in BLANK_KEYS and self.low is None:
+            # Blank amounts, counts and dates have the lowest keys; keep them out of open-ended ranges
+            self.low, self.include_low = BLANK_KEYS[kind], False
+
+    def parse(self, text):
+        """A text cell's key, or None if it cannot be compared"""
+        try:
+            return self.convert(text)
+        except ValueError:
+            return None
+
+    def inside(self, key):
+        if self.low is not None and (key < self.low or (key == self.low and not self.include_low)):
+            return False
+        return self.high is None or key < self.high or (key == self.high and self.include_high)
+
+    def span(self, keys):
+        """(start, end) of the keys inside the bound (ignoring negation) in a sorted sequence"""
+        start, end = 0, len(keys)
+        if self.low is not None:
+            start = (bisect_left if self.include_low else bisect_right)(keys, self.low)
+        if self.high is not None:
+            end = (bisect_right if self.include_high else bisect_left)(keys, self.high)
+        return start, max(start, end)
+
+    def accepts(self, key):
+        if key is None:
+            return self.negate
+        return self.inside(key) != self.negate
+
+def is_number(text):
+    try:
+        float(text)
+    except ValueError:
+        return False
+    return True
+
+class EncodedIndex:
+    """Hash index of a dictionary-encoded column, the rows of each distinct value, plus the values sorted"""
+
+    def __init__(self, column):
+        self.column = column
+        self.postings = None
+        self.counts = None
+        # {convert: (keys, codes)} of the distinct values that parse, in key order
+        self.sorted = {}
+        # (bound, codes) of the last comparison, which is usually counted and then answered
+        self.last = None
+
+    def sorted_keys(self, convert):
+        if convert is str and str not in self.sorted:
+            values = self.column.interner.values
+            codes = sorted(range(len(values)), key=values.__getitem__)
+            self.sorted[str] = ([values[code] for code in codes], codes)
+        if convert not in self.sorted:
+            pairs = []
+            for code, text in enumerate(self.column.interner.values):
+                try:
+                    pairs.append((convert(text), code))
+                except ValueError:
+                    continue
+            pairs.sort()
+            self.sorted[convert] = ([key for key, _ in pairs], [code for _, code in pairs])
+        return self.sorted[convert]
+
+    def codes(self, bound):
+        """Codes of the distinct values a comparison accepts"""
+        if self.last is not None and self.last[0] is bound:
+            return self.last[1]
+        if bound.exact:
+            code = self.column.interner.code(bound.low)
+            inside = [code] if code >= 0 else []
+        else:
+            keys, codes = self.sorted_keys(bound.convert)
+            start, end = bound.span(keys)
+            inside = codes[start:end]
+        if bound.negate:
+            inside = set(inside)
+            codes = [code for code in range(len(self.column.interner)) if code not in inside]
+        else:
+            codes = inside
+        self.last = (bound, codes)
+        return codes
+
+    def hits(self, codes):
+        """Boolean NumPy lookup table by code"""
+        hits = np.zeros(len(self.column.interner), dtype=bool)
+        hits[codes] = True
+        return hits
+
+    def count(self, bound):
+        if self.counts is None:
+            self.counts = self.column.counts()
+        codes = self.codes(bound)
+        if np is not None:
+            return int(self.counts[codes].sum())
+        return sum(self.counts[code] for code in codes)
+
+    def rows(self, bound):
+        codes = self.codes(bound)
+        if np is not None and len(codes) > 1:
+            # One pass over the codes beats sorting many values' merged postings
+            return np.flatnonzero(self.hits(codes)[np.frombuffer(self.column.codes, dtype=np.int32)])
+        if self.postings is None:
+            self.postings = Postings.group(self.column.codes, None, len(self.column.interner))
+        if len(codes) == 1:
+            return self.postings[codes[0]]
+        return self.postings.union(codes)
+
+    def test(self, bound, rows):
+        codes = self.codes(bound)
+        if np is not None:
+            return rows[self.hits(codes)[np.frombuffer(self.column.codes, dtype=np.int32)[rows]]]
+        codes = set(codes)
+        return [row for row in rows if self.column.codes[row] in codes]
+
+class SortedIndex:
+    """Sorted index of a typed numeric column: the row order that sorts it"""
+
+    def __init__(self, column):
+        self.column = np.frombuffer(column, dtype=column.typecode) if np is not None else column
+        self.order = None
+
+    def span(self, bound):
+        """(start, end) positions in sorted order of the rows inside the bound"""
+        if self.order is None:
+            if np is not None:
+                self.order = np.argsort(self.column, kind='stable')
+                self.sorted = self.column[self.order]
+            else:
+                self.order = sorted(range(len(self.column)), key=self.column.__getitem__)
+                self.sorted = array(self.column.typecode, [self.column[row] for row in self.order])
+        return bound.span(self.sorted)
+
+    def count(self, bound):
+        start, end = self.span(bound)
+        return len(self.order) - (end - start) if bound.negate else end - start
+
+    def rows(self, bound):
+        start, end = self.span(bound)
+        if np is not None:
+            rows = np.concatenate((self.order[:start], self.order[end:])) if bound.negate else self.order[start:end]
+            return np.sort(rows)
+        return sorted(self.order[:start] + self.order[end:] if bound.negate else self.order[start:end])
+
+    def test(self, bound, rows):
+        if np is not None:
+            keys = self.column[rows]
+            inside = np.ones(len(rows), dtype=bool)
+            if bound.low is not None:
+                inside &= keys >= bound.low if bound.include_low else keys > bound.low
+            if bound.high is not None:
+                inside &= keys <= bound.high if bound.include_high else keys < bound.high
+            return rows[inside != bound.negate]
+        return [row for row in rows if bound.accepts(self.column[row])]
+
+class PackedIndex:
+    """A packed, mostly distinct text column: hashed for text equality, scanned otherwise"""
+
+    def __init__(self, column):
+        self.column = column
+        self.hashed = None
+
+    def lookup(self, bound):
+        if self.hashed is None:
+            self.hashed = {}
+            for row, text in enumerate(self.column):
+                self.hashed.setdefault(text, []).append(row)
+        return self.hashed.get(bound.low, [])
+
+    def count(self, bound):
+        if bound.exact and not bound.negate:
+            return len(self.lookup(bound))
+        return len(self.column)
+
+    def rows(self, bound):
+        if bound.exact and not bound.negate:
+            rows = self.lookup(bound)
+        else:
+            rows = [row for row, text in enumerate(self.column) if bound.accepts(bound.parse(text))]
+        return np.array(rows, dtype=np.int64) if np is not None else rows
+
+    def test(self, bound, rows):
+        column = self.column
+        matched = [row for row in (rows.tolist() if np is not None else rows)
+                   if bound.accepts(bound.parse(column[row]))]
+        return np.array(matched, dtype=np.int64) if np is not None else matched
+
+class MissingIndex:
+    """A field the table does not have: no row matches"""
+
+    def count(self, bound):
+        return 0
+
+    def rows(self, bound):
+        return union([])
+
+    def test(self, bound, rows):
+        return rows[:0]
+
+class TableIndex:
+    """The field indexes of one CompactTable, each built the first time a query uses it"""
+
+    def __init__(self, table):
+        self.table = table
+        self.indexes = {}
+
+    def __len__(self):
+        return len(self.table)
+
+    def field(self, field):
+        if field not in self.indexes:
+            column = self.table.columns.get(field)
+            if column is None:
+                index = MissingIndex()
+            elif isinstance(column, EncodedColumn):
+                index = EncodedIndex(column)
+            elif isinstance(column, PackedColumn):
+                index = PackedIndex(column)
+            else:
+                index = SortedIndex(column)
+            self.indexes[field] = index
+        return self.indexes[field]
+
+    def all_rows(self):
+        return np.arange(len(self.table), dtype=np.int64) if np is not None else list(range(len(self.table)))
+
+class Comparison:
+    """field op value, or field between low and high"""
+
+    def __init__(self, field, op, *values):
+        self.field = field
+        self.bound = Bound(field, op, values)
+
+    def estimate(self, index):
+        return index.field(self.field).count(self.bound)
+
+    def rows(self, index):
+        return index.field(self.field).rows(self.bound)
+
+    def test(self, index, rows):
+        return index.field(self.field).test(self.bound, rows)
+
+class And:
+    def __init__(self, children):
+        self.children = children
+
+    def estimate(self, index):
+        return min(child.estimate(index) for child in self.children)
+
+    def by_selectivity(self, index):
+        return sorted(self.children, key=lambda child: child.estimate(index))
+
+    def rows(self, index):
+        first, *rest = self.by_selectivity(index)
+        rows = first.rows(index)
+        for child in rest:
+            if not len(rows):
+                break
+            rows = child.test(index, rows)
+        return rows
+
+    def test(self, index, rows):
+        for child in self.by_selectivity(index):
+            rows = child.test(index, rows)
+        return rows
+
+class Or:
+    def __init__(self, children):
+        self.children = children
+
+    def estimate(self, index):
+        return min(len(index), sum(child.estimate(index) for child in self.children))
+
+    def rows(self, index):
+        return union([child.rows(index) for child in self.children])
+
+    def test(self, index, rows):
+        return union([child.test(index, rows) for child in self.children])
+
+class Not:
+    def __init__(self, child):
+        self.child = child
+
+    def estimate(self, index):
+        return len(index) - self.child.estimate(index)
+
+    def rows(self, index):
+        return difference(index.all_rows(), self.child.rows(index))
+
+    def test(self, index, rows):
+        return difference(rows, self.child.test(index, rows))
+
+class Parser:
+    """Recursive descent parser from query text to a predicate tree"""
+
+    def __init__(self, text):
+        self.text = text.strip()
+        tokens = tokenize(self.text)
+        self.tokens = [(kind, token) for kind, token, _ in tokens]
+        self.spans = [span for _, _, span in tokens]
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def advance(self):
+        token = self.peek()
+        self.pos += 1
+        return token
+
+    def keyword(self, word):
+        if self.peek() == ('word', word):
+            self.pos += 1
+            return True
+        return False
+
+    def parse(self):
+        if not self.tokens:
+            raise ValueError("Empty query")
+        node = self.expression()
+        if self.pos < len(self.tokens):
+            raise ValueError(f"Unexpected {self.peek()[1]!r}")
+        return node
+
+    def expression(self):
+        children = [self.term()]
+        while self.keyword('or'):
+            children.append(self.term())
+        return children[0] if len(children) == 1 else Or(children)
+
+    def term(self):
+        children = [self.factor()]
+        while self.keyword('and'):
+            children.append(self.factor())
+        return children[0] if len(children) == 1 else And(children)
+
+    def factor(self):
+        if self.keyword('not'):
+            return Not(self.factor())
+        if self.peek() == ('paren', '('):
+            self.pos += 1
+            node = self.expression()
+            if self.advance() != ('paren', ')'):
+                raise ValueError("Missing ')'")
+            return node
+        return self.comparison()
+
+    def comparison(self):
+        kind, field = self.advance()
+        if kind != 'word' or field in KEYWORDS:
+            raise ValueError(f"Expected a field name, got {field!r}" if field else "Expected a field name")
+        if self.keyword('between'):
+            low = self.value(before_and=True)
+            if not self.keyword('and'):
+                raise ValueError(f"Expected '{field} between <low> and <high>'")
+            return Comparison(field, 'between', low, self.value())
+        kind, op = self.advance()
+        if kind != 'op':
+            raise ValueError(f"Expected one of {', '.join(sorted(OPERATORS))} after {field}")
+        return Comparison(field, op, self.value())
+
+    def starts_factor(self, pos):
+        """Whether the tokens from pos on begin a comparison, a not or a parenthesis"""
+        token = self.tokens[pos] if pos < len(self.tokens) else (None, None)
+        if token in (('word', 'not'), ('paren', '(')):
+            return True
+        following = self.tokens[pos + 1] if pos + 1 < len(self.tokens) else (None, None)
+        return (token[0] == 'word' and token[1] not in KEYWORDS
+                and (following[0] == 'op' or following == ('word', 'between')))
+
+    def value(self, before_and=False):
+        """A quoted value, or the text of the bare words up to the and/or that starts the next factor.
+
+        The low end of a between stops at its first and (before_and).
+        No words at all is a blank value.
+        """
+        if self.peek()[0] == 'value':
+            return self.advance()[1]
+        start = self.pos
+        while self.peek()[0] in ('word', 'value'):
+            kind, word = self.peek()
+            if kind == 'word' and word in ('and', 'or') and (
+                    (before_and and word == 'and') or self.starts_factor(self.pos + 1)):
+                break
+            self.pos += 1
+        if self.pos == start:
+            return ''
+        text = self.text[self.spans[start][0]:self.spans[self.pos - 1][1]]
+        if text[0] in '\'"':
+            raise ValueError(f"Unbalanced quote in {text!r}")
+        return text
+
+class Query:
+    """A parsed filter expression; see the module docstring"""
+
+    def __init__(self, text):
+        self.text = text
+        self.root = Parser(text).parse()
+
+    def rows(self, index):
+        """Sorted rows of a TableIndex's table that match"""
+        rows = self.root.rows(index)
+        return rows.tolist() if np is not None else list(rows)
+
+def parse_query(text):
+    return Query(text)
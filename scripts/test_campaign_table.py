@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""Tests for campaign_table.py typed column storage (run with python -m pytest scripts)"""
+
+from array import array
+
+import pytest
+
+from campaign_table import CompactTable, EncodedColumn
+
+@pytest.mark.parametrize('field, batches', [
+    ('contribution_amount', [['3300'], ['10.00'], ['25.50', '']]),
+    ('contribution_number', [[''], ['2'], ['3']]),
+    ('contribution_date', [['2024-1-5'], ['2024-03-01'], ['']]),
+])
+def test_text_fallback_keeps_later_batches_as_text(field, batches):
+    table = CompactTable([field])
+    for values in batches:
+        table.extend({field: values})
+    assert isinstance(table.columns[field], EncodedColumn)
+    assert [table.value(field, i) for i in range(len(table))] == [v for values in batches for v in values]
+
+def test_text_fallback_formats_typed_batches():
+    table = CompactTable(['contribution_amount'])
+    table.extend({'contribution_amount': ['3300']})
+    table.extend({'contribution_amount': array('q', [1000, 5])})
+    assert [table.value('contribution_amount', i) for i in range(3)] == ['3300', '10.00', '0.05']
+
+def test_clean_batches_stay_typed():
+    table = CompactTable(['contribution_amount'])
+    table.extend({'contribution_amount': ['10.00']})
+    table.extend({'contribution_amount': ['2500.00']})
+    assert isinstance(table.columns['contribution_amount'], array)
+    assert [table.value('contribution_amount', i) for i in range(2)] == ['10.00', '2500.00']
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""Tests for table_io.py CSV readers (run with python -m pytest scripts)"""
+
+import pytest
+
+from table_io import ColumnarWriter, iter_batches, iter_rows, load_frame
+
+@pytest.fixture
+def ragged_csv(tmp_path):
+    path = tmp_path / 'table.csv'
+    path.write_text('a,b,c\n1,2,3\n\n4,5\n6,7,8\n\n')
+    return str(path)
+
+def test_iter_rows_fields_skips_blank_lines_and_pads_short_rows(ragged_csv):
+    assert list(iter_rows(ragged_csv, fields=['c', 'a'])) == [
+        {'c': '3', 'a': '1'}, {'c': '', 'a': '4'}, {'c': '8', 'a': '6'}]
+
+def test_iter_rows_skips_blank_lines(ragged_csv):
+    assert [row['a'] for row in iter_rows(ragged_csv)] == ['1', '4', '6']
+
+def test_iter_batches_skips_blank_lines_and_pads_short_rows(ragged_csv):
+    assert list(iter_batches(ragged_csv, ['b', 'c'])) == [{'b': ['2', '5', '7'], 'c': ['3', '', '8']}]
+
+@pytest.fixture
+def retyped_columns(tmp_path):
+    """A columnar table whose stored types differ from column_type()'s defaults"""
+    path = str(tmp_path / 'table.cols')
+    with ColumnarWriter(path, ['note', 'contribution_amount'], types=['int', 'str']) as writer:
+        writer.write({'note': '7', 'contribution_amount': '3300'})
+        writer.write({'note': '8', 'contribution_amount': ''})
+    return path
+
+def test_columnar_readers_decode_by_stored_types(retyped_columns):
+    assert list(iter_rows(retyped_columns)) == [
+        {'note': '7', 'contribution_amount': '3300'}, {'note': '8', 'contribution_amount': ''}]
+    assert list(iter_batches(retyped_columns, ['note'])) == [{'note': ['7', '8']}]
+
+def test_load_frame_decodes_by_stored_types(retyped_columns):
+    pytest.importorskip('pandas')
+    frame = load_frame(retyped_columns)
+    assert frame['note'].tolist() == [7, 8]
+    assert frame['contribution_amount'].tolist() == ['3300', '']
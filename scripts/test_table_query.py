@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Tests for table_query.py filter parsing and matching (run with python -m pytest scripts)"""
+
+import pytest
+
+from campaign_table import CompactTable
+from table_query import And, Comparison, Or, TableIndex, parse_query
+
+ROWS = [
+    {'last_name': "O'Brien", 'employer': 'Smith and Sons', 'state': 'CA', 'contribution_amount': '100.00',
+     'contribution_date': '2024-03-01'},
+    {'last_name': 'Brien', 'employer': 'Smith', 'state': 'CA', 'contribution_amount': '',
+     'contribution_date': ''},
+    {'last_name': 'Lee', 'employer': 'Consulting Firm', 'state': 'NY', 'contribution_amount': '2500.00',
+     'contribution_date': '2024-06-30'},
+    {'last_name': 'Diaz', 'employer': 'Owner or Manager', 'state': 'TX', 'contribution_amount': '50.00',
+     'contribution_date': '2024-05-15'},
+]
+
+@pytest.fixture
+def index():
+    fields = list(ROWS[0])
+    table = CompactTable(fields)
+    table.extend({field: [row[field] for row in ROWS] for field in fields})
+    return TableIndex(table)
+
+def matches(index, text):
+    return parse_query(text).rows(index)
+
+def value_of(text):
+    node = parse_query(text).root
+    assert isinstance(node, Comparison)
+    return node.bound.low
+
+def test_apostrophes_are_plain_text(index):
+    assert value_of("last_name=O'Brien") == "O'Brien"
+    assert matches(index, "last_name=O'Brien") == [0]
+    assert matches(index, "last_name=O'Brien or last_name='Lee'") == [0, 2]
+
+def test_bare_value_may_contain_and_or(index):
+    assert value_of('employer=Smith and Sons') == 'Smith and Sons'
+    assert value_of('employer=Owner or Manager') == 'Owner or Manager'
+    assert matches(index, 'employer=Smith and Sons') == [0]
+    assert matches(index, 'employer=Owner or Manager') == [3]
+
+def test_and_or_before_a_comparison_still_combine(index):
+    assert isinstance(parse_query('employer=Smith and Sons and state=CA').root, And)
+    assert isinstance(parse_query('employer=Smith or (state=NY)').root, Or)
+    assert matches(index, 'employer=Smith and Sons and state=CA') == [0]
+    assert matches(index, 'employer=Smith or not state=CA') == [1, 2, 3]
+
+def test_bare_value_keeps_its_spacing(index):
+    assert value_of('employer=Consulting  Firm') == 'Consulting  Firm'
+    assert matches(index, 'employer=Consulting  Firm') == []
+    assert matches(index, 'employer=Consulting Firm') == [2]
+
+def test_empty_value_matches_blanks(index):
+    assert matches(index, 'contribution_amount=') == [1]
+    assert matches(index, 'contribution_amount!=') == [0, 2, 3]
+    assert matches(index, 'contribution_date=') == [1]
+    assert matches(index, 'contribution_amount<1000') == [0, 3]
+
+def test_between_stops_at_its_own_and(index):
+    assert matches(index, 'contribution_date between 2024-03-01 and 2024-05-31 and state=CA') == [0]
+
+def test_unbalanced_quote_at_the_start_of_a_value():
+    with pytest.raises(ValueError):
+        parse_query('employer="Smith and Sons')
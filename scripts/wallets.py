@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Batch Ethereum wallet validation with EIP-55 checksums
+
+validate_wallets() gives each address one of four statuses:
+
+- 'unchecksummed': 0x + 40 hex digits all in one case, so there is no
+  checksum to verify. EIP-55 accepts these, and generated test wallets are
+  all lowercase.
+- 'checksummed': mixed-case hex whose capitals match the EIP-55 checksum
+- 'bad_checksum': mixed-case hex whose capitals do not match, usually a
+  mistyped address
+- 'bad_format': anything else
+
+With NumPy the format is checked in one pass over a fixed-width byte
+matrix. Keccak-256 (the original padding Ethereum uses, not hashlib's
+SHA3-256) runs across a whole batch at once, one uint64 lane per address.
+Without NumPy both fall back to plain Python. A wallet's checksum verdict
+is cached, so repeat donors are hashed once.
+"""
+
+import re
+
+try:
+    import numpy as np
+except ImportError:  # the pure Python paths give the same results, only slower
+    np = None
+
+UNCHECKSUMMED = 'unchecksummed'
+CHECKSUMMED = 'checksummed'
+BAD_CHECKSUM = 'bad_checksum'
+BAD_FORMAT = 'bad_format'
+VALID_STATUSES = {UNCHECKSUMMED, CHECKSUMMED}
+
+WALLET_PATTERN = re.compile(r'^0x[a-fA-F0-9]{40}$')
+WALLET_LENGTH = 42
+# Checksum verdicts kept between batches; cleared when full
+CACHE_SIZE = 1 << 20
+
+MASK64 = (1 << 64) - 1
+KECCAK_RATE = 136  # bytes absorbed per block by Keccak-256
+ROUND_CONSTANTS = [
+    0x0000000000000001, 0x0000000000008082, 0x800000000000808A, 0x8000000080008000,
+    0x000000000000808B, 0x0000000080000001, 0x8000000080008081, 0x8000000000008009,
+    0x000000000000008A, 0x0000000000000088, 0x0000000080008009, 0x000000008000000A,
+    0x000000008000808B, 0x800000000000008B, 0x8000000000008089, 0x8000000000008003,
+    0x8000000000008002, 0x8000000000000080, 0x000000000000800A, 0x800000008000000A,
+    0x8000000080008081, 0x8000000000008080, 0x0000000080000001, 0x8000000080008008,
+]
+# Rotation of lane x + 5 * y in the rho step
+ROTATIONS = [0, 1, 62, 28, 27, 36, 44, 6, 55, 20, 3, 10, 43, 25, 39,
+             41, 45, 15, 21, 8, 18, 2, 61, 56, 14]
+# Destination of lane x + 5 * y in the pi step: (y, 2x + 3y)
+PI_TARGETS = [i // 5 + 5 * ((2 * (i % 5) + 3 * (i // 5)) % 5) for i in range(25)]
+
+checksum_cache = {}
+
+def rotate(lane, shift):
+    return ((lane << shift) | (lane >> (64 - shift))) & MASK64 if shift else lane
+
+def keccak_f1600(lanes):
+    """The Keccak-f[1600] permutation of 25 64-bit lanes, indexed x + 5 * y"""
+    for constant in ROUND_CONSTANTS:
+        columns = [lanes[x] ^ lanes[x + 5] ^ lanes[x + 10] ^ lanes[x + 15] ^ lanes[x + 20] for x in range(5)]
+        mixers = [columns[(x - 1) % 5] ^ rotate(columns[(x + 1) % 5], 1) for x in range(5)]
+        moved = [0] * 25
+        for i in range(25):
+            moved[PI_TARGETS[i]] = rotate(lanes[i] ^ mixers[i % 5], ROTATIONS[i])
+        lanes = [moved[i] ^ (~moved[i - i % 5 + (i + 1) % 5] & moved[i - i % 5 + (i + 2) % 5])
+                 for i in range(25)]
+        lanes[0] ^= constant
+    return lanes
+
+def pad(data):
+    """Keccak multi-rate padding (0x01 ... 0x80) of a message to whole blocks"""
+    padded = bytearray(data) + b'\x01' + bytes(-(len(data) + 1) % KECCAK_RATE)
+    padded[-1] |= 0x80
+    return bytes(padded)
+
+def keccak256(data):
+    """Keccak-256 digest of bytes, as used for Ethereum addresses"""
+    lanes = [0] * 25
+    padded = pad(data)
+    for start in range(0, len(padded), KECCAK_RATE):
+        block = padded[start:start + KECCAK_RATE]
+        for i in range(KECCAK_RATE // 8):
+            lanes[i] ^= int.from_bytes(block[i * 8:i * 8 + 8], 'little')
+        lanes = keccak_f1600(lanes)
+    return b''.join(lane.to_bytes(8, 'little') for lane in lanes[:4])
+
+def np_rotate(lanes, shift):
+    if not shift:
+        return lanes
+    return (lanes << np.uint64(shift)) | (lanes >> np.uint64(64 - shift))
+
+def np_keccak256(messages):
+    """Keccak-256 of equal-length single-block messages, as an (n, 32) uint8 array"""
+    count = len(messages)
+    padded = np.frombuffer(b''.join(pad(message) for message in messages), dtype='<u8')
+    lanes = np.zeros((25, count), dtype=np.uint64)
+    lanes[:KECCAK_RATE // 8] = padded.reshape(count, KECCAK_RATE // 8).T
+    lanes = list(lanes)
+    for constant in ROUND_CONSTANTS:
+        columns = [lanes[x] ^ lanes[x + 5] ^ lanes[x + 10] ^ lanes[x + 15] ^ lanes[x + 20] for x in range(5)]
+        mixers = [columns[(x - 1) % 5] ^ np_rotate(columns[(x + 1) % 5], 1) for x in range(5)]
+        moved = [None] * 25
+        for i in range(25):
+            moved[PI_TARGETS[i]] = np_rotate(lanes[i] ^ mixers[i % 5], ROTATIONS[i])
+        lanes = [moved[i] ^ (~moved[i - i % 5 + (i + 1) % 5] & moved[i - i % 5 + (i + 2) % 5])
+                 for i in range(25)]
+        lanes[0] = lanes[0] ^ np.uint64(constant)
+    return np.stack(lanes[:4], axis=1).astype('<u8').view(np.uint8).reshape(count, 32)
+
+def to_checksum_address(wallet):
+    """EIP-55 mixed-case form of a well-formed address"""
+    digits = wallet[2:].lower()
+    digest = keccak256(digits.encode()).hex()
+    return '0x' + ''.join(c.upper() if int(h, 16) >= 8 else c for c, h in zip(digits, digest))
+
+def checksums_match(wallets):
+    """Whether each well-formed mixed-case address matches its EIP-55 checksum"""
+    if np is None or len(wallets) < 2:
+        return [to_checksum_address(wallet) == wallet for wallet in wallets]
+    digits = [wallet[2:] for wallet in wallets]
+    digests = np_keccak256([d.lower().encode() for d in digits])
+    nibbles = np.empty((len(wallets), 64), dtype=np.uint8)
+    nibbles[:, 0::2] = digests >> 4
+    nibbles[:, 1::2] = digests & 15
+    chars = np.frombuffer(''.join(digits).encode(), dtype=np.uint8).reshape(len(wallets), 40)
+    letters = chars >= ord('A')
+    upper = chars <= ord('F')
+    return (~letters | (upper == (nibbles[:, :40] >= 8))).all(axis=1).tolist()
+
+def cached_checksums(wallets):
+    """checksums_match() for distinct wallets, hashing only those not in the cache"""
+    unseen = [wallet for wallet in wallets if wallet not in checksum_cache]
+    if len(checksum_cache) + len(unseen) > CACHE_SIZE:
+        checksum_cache.clear()
+    checksum_cache.update(zip(unseen, checksums_match(unseen)))
+    return {wallet: checksum_cache[wallet] for wallet in wallets}
+
+def format_flags(wallets):
+    """(well formed, mixed case) flags per wallet, from one pass over a fixed-width byte matrix"""
+    encoded = [wallet.encode() for wallet in wallets]
+    lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+    chars = np.array(encoded, dtype=f'S{WALLET_LENGTH}').view(np.uint8).reshape(len(encoded), WALLET_LENGTH)
+    digits = chars[:, 2:]
+    lower = (digits >= ord('a')) & (digits <= ord('f'))
+    upper = (digits >= ord('A')) & (digits <= ord('F'))
+    hex_digits = lower | upper | ((digits >= ord('0')) & (digits <= ord('9')))
+    well_formed = ((lengths == WALLET_LENGTH) & (chars[:, 0] == ord('0')) & (chars[:, 1] == ord('x'))
+                   & hex_digits.all(axis=1))
+    return well_formed.tolist(), (lower.any(axis=1) & upper.any(axis=1)).tolist()
+
+def validate_wallets(wallets):
+    """EIP-55 status of each wallet address string (see the module docstring), in input order"""
+    if not wallets:
+        return []
+    if np is not None:
+        well_formed, mixed = format_flags(wallets)
+    else:
+        well_formed = [bool(WALLET_PATTERN.fullmatch(wallet)) for wallet in wallets]
+        mixed = [ok and wallet[2:].lower() != wallet[2:] and wallet[2:].upper() != wallet[2:]
+                 for ok, wallet in zip(well_formed, wallets)]
+    to_check = list(dict.fromkeys(w for w, ok, m in zip(wallets, well_formed, mixed) if ok and m))
+    verdicts = cached_checksums(to_check) if to_check else {}
+    return [BAD_FORMAT if not ok else (CHECKSUMMED if verdicts[wallet] else BAD_CHECKSUM) if m else UNCHECKSUMMED
+            for wallet, ok, m in zip(wallets, well_formed, mixed)]